@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.mime.image import MIMEImage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.message import MessageTemplate
+
+SENDER = "sender@example.com"
+SUBJECT = "Job Opportunity at Autoline Industries"
+HTML = "<html><body>" + "<p>Hello candidate, this is a representative body line.</p>" * 40 + "</body></html>"
+MERGE_HTML = "<html><body><p>Hi {{name | there}}, we saw your profile from {{city}}.</p>" + HTML[12:]
+
+
+def legacy_message(to_email, image_bytes):
+    # The pre-template send_email() path: a fresh MIME tree and serialization per recipient.
+    msg = MIMEMultipart("related")
+    msg["From"] = SENDER
+    msg["To"] = to_email
+    msg["Subject"] = SUBJECT.strip()
+    alt = MIMEMultipart("alternative")
+    msg.attach(alt)
+    alt.attach(MIMEText(HTML, "html"))
+    if image_bytes:
+        attachment = MIMEImage(image_bytes)
+        attachment.add_header("Content-ID", "<creative>")
+        attachment.add_header("Content-Disposition", "inline", filename="Navyanta Recruitment Flyer.png")
+        msg.attach(attachment)
+    return msg.as_string()
+
+
+def measure(label, fn, recipients):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = 0
+    for email in recipients:
+        size = len(fn(email))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_msg = elapsed / len(recipients)
+    print(f"{label:<10} {per_msg * 1000:>10.3f} ms/msg {len(recipients) / elapsed:>10.1f} msg/s {peak / 1e6:>9.1f} MB peak {size / 1e6:>7.2f} MB/msg")
+    return per_msg
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-recipient MIME building with the precompiled MessageTemplate.")
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--image-mb", type=float, default=3.0)
+    args = parser.parse_args()
+
+    image_bytes = b"\x89PNG\r\n\x1a\n" + os.urandom(int(args.image_mb * 1024 * 1024))
+    recipients = [f"candidate{i}@example.com" for i in range(args.recipients)]
+
+    legacy = measure("legacy", lambda email: legacy_message(email, image_bytes), recipients)
+
+    start = time.perf_counter()
+    template = MessageTemplate(SENDER, SUBJECT, HTML, image_bytes)
+    print(f"template compiled once in {(time.perf_counter() - start) * 1000:.1f} ms")
+    compiled = measure("template", template.render, recipients)
+
+    print(f"speedup: {legacy / compiled:.0f}x")
+
+    # Personalized body: values bound a batch at a time as the engine does, then rendered.
+    merge = MessageTemplate(SENDER, SUBJECT, MERGE_HTML, image_bytes)
+    rows = [{"name": f"Candidate <{i}>", "city": ("Pune", "Delhi", "Chennai")[i % 3]} for i in range(args.recipients)]
+    values = dict(zip(recipients, merge.bind_batch(rows)))
+    measure("merge", lambda email: merge.render(email, values[email]), recipients)
+
+
+if __name__ == "__main__":
+    main()
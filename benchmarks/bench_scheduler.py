@@ -0,0 +1,81 @@
+import argparse
+import os
+import smtplib
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.scheduler import DomainScheduler
+from navyanta.sender import SenderPool
+
+from smtp_sink import SMTPSink
+
+SENDER = "sender@example.com"
+MESSAGE = b"Subject: scheduler benchmark\r\n\r\nhello\r\n"
+
+
+def clustered_list(total, big_share):
+    # Spreadsheets are usually sorted or grouped, so a big provider arrives as one block.
+    big = int(total * big_share)
+    emails = [f"user{i}@gmail.com" for i in range(big)]
+    emails += [f"user{i}@yahoo.com" for i in range((total - big) // 3)]
+    emails += [f"user{i}@corp{i % 200}.example" for i in range(total - len(emails))]
+    return emails
+
+
+def run(label, sink, emails, args, scheduler=None):
+    settle = scheduler.settle if scheduler else None
+    pool = SenderPool(
+        lambda: smtplib.SMTP("127.0.0.1", sink.port, timeout=10),
+        lambda server, email: server.sendmail(SENDER, [email], MESSAGE),
+        size=args.workers,
+        record=(lambda result: settle(result.email, result.success)) if settle else None,
+        retry_count=args.retries,
+        retry_delay=args.retry_delay,
+        retry_max_delay=args.retry_delay * 8,
+        defer=scheduler.defer if scheduler else None,
+    )
+    sink.count = 0
+    sink.deferred = {}
+    for window in sink.windows.values():
+        window.clear()
+    source = scheduler.schedule(emails) if scheduler else emails
+    start = time.perf_counter()
+    first_small = None
+    failed = 0
+    for result in pool.run(source):
+        if not result.success:
+            failed += 1
+        elif first_small is None and not result.email.endswith("@gmail.com"):
+            first_small = time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    deferrals = sum(sink.deferred.values())
+    print(
+        f"{label:<10} {elapsed:>7.2f} s {sink.count:>7} sent {failed:>6} failed {deferrals:>7} deferrals "
+        f"{sink.count / elapsed:>8.1f} msg/s  first non-gmail after {first_small or 0:.2f} s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clustered list vs domain-aware scheduling against a sink that throttles gmail.com.")
+    parser.add_argument("--recipients", type=int, default=3000)
+    parser.add_argument("--big-share", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--throttle", type=int, default=200, help="gmail.com messages accepted per --throttle-window seconds")
+    parser.add_argument("--throttle-window", type=float, default=1.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--retry-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    sink = SMTPSink(throttle={"gmail.com": (args.throttle, args.throttle_window)}).start()
+    emails = clustered_list(args.recipients, args.big_share)
+    print(f"{len(emails)} recipients, {args.big_share:.0%} gmail.com in one block, gmail.com capped at {args.throttle}/{args.throttle_window:g}s")
+    run("in order", sink, emails, args)
+    scheduler = DomainScheduler(base_backoff=args.throttle_window, max_backoff=args.throttle_window * 8, max_defers=args.retries * 4)
+    run("scheduled", sink, emails, args, scheduler)
+    sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smtp_sink import SMTPSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOMAINS = ["gmail.com"] * 5 + ["yahoo.com"] * 2 + ["outlook.com"] * 2 + ["corp.example"]
+SIZES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+
+
+# ================= SYNTHETIC LISTS =================
+def synthetic_rows(rows, seed=7):
+    # Roughly what an exported candidate sheet looks like: ~1% malformed addresses and
+    # ~1% duplicates with different casing, so ingestion does real cleaning work.
+    rng = random.Random(seed)
+    for i in range(rows):
+        roll = rng.random()
+        if roll < 0.01:
+            email = f"candidate{i}.example.com"
+        elif roll < 0.02 and i:
+            email = f"  Candidate{rng.randrange(i)}@{DOMAINS[0].upper()} "
+        else:
+            email = f"candidate{i}@{DOMAINS[i % len(DOMAINS)]}"
+        yield [f"Candidate {i}", email, f"City {i % 500}", f"+91 98{i % 100000000:08d}"]
+
+
+def synthetic_list(workdir, rows, fmt):
+    # Generated once per size and format, then reused by later runs.
+    path = os.path.join(workdir, f"recipients_{rows}.{fmt}")
+    if os.path.exists(path):
+        return path
+    tmp = path + ".tmp"
+    header = ["Name", "Email", "City", "Phone"]
+    if fmt == "xlsx":
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Recipients")
+        ws.append(header)
+        for row in synthetic_rows(rows):
+            ws.append(row)
+        wb.save(tmp)
+    else:
+        import csv
+
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(synthetic_rows(rows))
+    os.replace(tmp, path)
+    return path
+
+
+# ================= MEASUREMENTS =================
+# Each one runs in a fresh process so peak RSS is its own.
+def _peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def bench_ingest(path, rows, workdir):
+    from navyanta.recipients import ingest_recipients
+
+    out = os.path.join(workdir, f"ingest_{os.getpid()}.db")
+    start = time.perf_counter()
+    cpu = time.process_time()
+    with open(path, "rb") as source:
+        recipients = ingest_recipients(source, path, out, rejects_path=out + ".rejects.csv")
+    elapsed = time.perf_counter() - start
+    summary = recipients.summary()
+    recipients.close()
+    for leftover in (out, out + ".rejects.csv"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    return {
+        "bench": "ingest",
+        "rows": rows,
+        "format": os.path.splitext(path)[1][1:],
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1),
+        "cpu_seconds": round(time.process_time() - cpu, 3),
+        "valid": summary["valid"],
+        "rejected": summary["rejected"],
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_ledger(rows, durability, workdir):
+    from navyanta.ledger import LedgerStore
+
+    path = os.path.join(workdir, f"ledger_{durability}_{os.getpid()}.db")
+    ledger = LedgerStore(path, durability=durability)
+    emails = [f"candidate{i}@{DOMAINS[i % len(DOMAINS)]}" for i in range(rows)]
+    now = datetime.now().isoformat()
+
+    start = time.perf_counter()
+    for i, email in enumerate(emails):
+        if i % 20 == 19:
+            ledger.log_failed("bench", "Bench", email, "550 rejected", now, "permanent")
+        else:
+            ledger.log_sent("bench", "Bench", email, now)
+    ledger.flush()
+    write = time.perf_counter() - start
+
+    rng = random.Random(1)
+    probes = [rng.choice(emails) for _ in range(min(rows, 10000))]
+    start = time.perf_counter()
+    for email in probes:
+        ledger.is_sent("Bench", email)
+    lookup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(probes), 5000):
+        ledger.sent_among("Bench", probes[i:i + 5000])
+    batch_lookup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ledger.sent_emails("Bench")
+    full_load = time.perf_counter() - start
+
+    ledger.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return {
+        "bench": "ledger",
+        "rows": rows,
+        "durability": durability,
+        "write_us_per_row": round(write / rows * 1e6, 2),
+        "lookup_us": round(lookup / len(probes) * 1e6, 2),
+        "batch_lookup_us_per_email": round(batch_lookup / len(probes) * 1e6, 2),
+        "load_sent_set_seconds": round(full_load, 4),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_send(path, rows, port, workdir, overrides):
+    from navyanta.config import load_config
+    from navyanta.engine import Engine
+    from navyanta.worker import CampaignJob
+
+    data_dir = tempfile.mkdtemp(prefix="send_", dir=workdir)
+    # The engine logs every send; keep that cost but write it to a file only.
+    logger = logging.getLogger(f"navyanta.bench.{os.getpid()}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(logging.FileHandler(os.path.join(data_dir, "send.log")))
+
+    config = load_config()
+    config.update(
+        RATE_PER_MINUTE=0,
+        RETRY_DELAY=0.05,
+        RETRY_MAX_DELAY=0.2,
+        BREAKER_THRESHOLD=1000,
+        ACCOUNT_DAILY_QUOTA=0,
+        METRICS_TEXTFILE="",
+    )
+    config.update(overrides)
+    secrets = {"SENDER_ACCOUNTS": [{"email": "bench@example.com", "host": "127.0.0.1", "port": port, "use_tls": False}]}
+    engine = Engine(config, secrets, data_dir=data_dir, logs_dir=data_dir, logger=logger)
+    with open(path, "rb") as source:
+        recipients, _ = engine.ingest(source, path)
+    template = engine.build_message_template("Benchmark", "Hello from the benchmark suite.", None)
+    job = CampaignJob(engine.get_campaign_id("Bench"), "Bench", None, recipients.path)
+    job.state = "running"
+    job.started = time.time()
+
+    start = time.perf_counter()
+    cpu = time.process_time()
+    status = engine.run_campaign(job, recipients, template)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    stages = job.metrics.summary()["stages"]
+    engine.ledger.close()
+    handled = job.sent + job.failed
+    return {
+        "bench": "send",
+        "rows": rows,
+        "status": status,
+        "durability": config["LEDGER_DURABILITY"],
+        "engine": config["SEND_ENGINE"],
+        "pool_size": config["ASYNC_SESSIONS"] if config["SEND_ENGINE"] == "asyncio" else config["POOL_SIZE"],
+        "seconds": round(elapsed, 3),
+        "sent": job.sent,
+        "failed": job.failed,
+        "messages_per_sec": round(job.sent / elapsed, 1),
+        "cpu_ms_per_message": round(cpu / handled * 1000, 4) if handled else 0,
+        "stage_p50_ms": {stage: s["p50_ms"] for stage, s in stages.items()},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def isolated(fn, *args):
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+# ================= RESULTS =================
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def result_key(result):
+    # Send results are only comparable under the same sink behaviour.
+    return (result["bench"], result["rows"], result.get("format"), result.get("durability"), result.get("engine"),
+            json.dumps(result.get("sink"), sort_keys=True))
+
+
+# Metrics where a lower value is better; everything else numeric is higher-is-better.
+LOWER_IS_BETTER = ("seconds", "cpu_seconds", "cpu_ms_per_message", "write_us_per_row", "lookup_us",
+                   "batch_lookup_us_per_email", "load_sent_set_seconds", "peak_rss_mb")
+
+
+def compare(baseline_path, results, tolerance):
+    # Prints every metric that moved by more than `tolerance` against the baseline
+    # and returns how many of those moves were regressions.
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        old = baseline.get(result_key(result))
+        if not old:
+            continue
+        for metric, value in result.items():
+            before = old.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before or metric in ("rows", "valid", "rejected", "sent", "failed", "pool_size"):
+                continue
+            change = (value - before) / before
+            worse = change > 0 if metric in LOWER_IS_BETTER else change < 0
+            if abs(change) > tolerance:
+                regressions += worse
+                flag = "REGRESSION" if worse else "improved"
+                print(f"  {flag:<10} {result['bench']:<7} {result['rows']:>8} {metric:<26} {before:>12} -> {value:<12} ({change:+.1%})")
+    return regressions
+
+
+def parse_sizes(text):
+    return [SIZES.get(s.strip().lower()) or int(s) for s in text.split(",") if s.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion, ledger and end-to-end send benchmarks against a local SMTP sink.")
+    parser.add_argument("--sizes", default="1k,100k,1m", help="Workbook sizes for ingestion (1k, 10k, 100k, 1m or a row count).")
+    parser.add_argument("--send-sizes", default="1k,10k", help="List sizes sent end to end through the sink.")
+    parser.add_argument("--format", choices=("xlsx", "csv"), default="xlsx")
+    parser.add_argument("--ledger-rows", type=int, default=20000)
+    parser.add_argument("--durability", default="strict,group", help="Ledger modes to benchmark.")
+    parser.add_argument("--engine", default="threads", help="Send engines to benchmark: threads, asyncio or both.")
+    parser.add_argument("--pool-size", type=int, default=4, help="Threads with the threads engine.")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions with the asyncio engine.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Sink delay before each end-of-DATA reply.")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of messages the sink rejects.")
+    parser.add_argument("--error-code", type=int, default=451)
+    parser.add_argument("--throttle", default="", help="domain=messages/seconds, e.g. gmail.com=500/1")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "navyanta-bench"), help="Where generated lists are cached.")
+    parser.add_argument("--out", help="Results file (default benchmarks/results/<time>.json).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative change reported by --compare.")
+    parser.add_argument("--skip", default="", help="Comma-separated benches to skip: ingest, ledger, send.")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    skip = {s.strip() for s in args.skip.split(",") if s.strip()}
+    results = []
+
+    def report(result):
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+    if "ingest" not in skip:
+        for rows in parse_sizes(args.sizes):
+            path = synthetic_list(args.workdir, rows, args.format)
+            report(isolated(bench_ingest, path, rows, args.workdir))
+
+    if "ledger" not in skip:
+        for durability in args.durability.split(","):
+            report(isolated(bench_ledger, args.ledger_rows, durability.strip(), args.workdir))
+
+    if "send" not in skip:
+        throttle = {}
+        if args.throttle:
+            domain, _, limit = args.throttle.partition("=")
+            messages, _, seconds = limit.partition("/")
+            throttle[domain] = (int(messages), float(seconds or 1))
+        # The sink runs in this process so the send benchmark's CPU figure is the sender's alone.
+        sink = SMTPSink(throttle=throttle, latency=args.latency_ms / 1000, error_rate=args.error_rate, error_code=args.error_code, seed=1).start()
+        for rows in parse_sizes(args.send_sizes):
+            path = synthetic_list(args.workdir, rows, "csv")
+            for engine in args.engine.split(","):
+                for durability in args.durability.split(","):
+                    overrides = {
+                        "SEND_ENGINE": engine.strip(),
+                        "POOL_SIZE": args.pool_size,
+                        "ASYNC_SESSIONS": args.sessions,
+                        "LEDGER_DURABILITY": durability.strip(),
+                    }
+                    result = isolated(bench_send, path, rows, sink.port, args.workdir, overrides)
+                    result["sink"] = {"latency_ms": args.latency_ms, "error_rate": args.error_rate, "error_code": args.error_code, "throttle": args.throttle}
+                    report(result)
+        sink.shutdown()
+
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "args": vars(args), "results": results}, f, indent=2)
+    print(f"Results: {out}")
+
+    if args.compare:
+        regressions = compare(args.compare, results, args.tolerance)
+        print(f"{regressions} regression(s) beyond {args.tolerance:.0%} against {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
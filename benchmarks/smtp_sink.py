@@ -0,0 +1,105 @@
+import random
+import socketserver
+import threading
+import time
+from collections import deque
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    # Just enough ESMTP for smtplib: no TLS, no AUTH, every message is counted and dropped.
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode("utf-8", "replace").strip()
+            verb = cmd[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-sink")
+                self.reply("250 8BITMIME")
+            elif verb == "RCPT":
+                domain = cmd.rpartition("@")[2].rstrip(">").lower()
+                if self.server.throttled(domain):
+                    self.reply("451 4.7.1 Too many messages for this domain, try again later")
+                else:
+                    self.reply("250 ok")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                if self.server.latency:
+                    time.sleep(self.server.latency)
+                if self.server.inject_error():
+                    self.reply(f"{self.server.error_code} injected failure")
+                else:
+                    self.server.delivered()
+                    self.reply("250 ok")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    # throttle maps a recipient domain to (messages, seconds): past that many accepted
+    # RCPTs inside the sliding window the domain answers 451 at RCPT time.
+    # latency is added before every end-of-DATA reply; error_rate of those replies
+    # are error_code instead of 250 (451: retried by the sender, 550: not).
+    allow_reuse_address = True
+    daemon_threads = True
+    # The asyncio engine opens dozens of sessions at once.
+    request_queue_size = 256
+
+    def __init__(self, port=0, throttle=None, latency=0.0, error_rate=0.0, error_code=451, seed=None):
+        super().__init__(("127.0.0.1", port), SinkHandler)
+        self.throttle = throttle or {}
+        self.windows = {domain: deque() for domain in self.throttle}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.random = random.Random(seed)
+        self.count = 0
+        self.errors = 0
+        self.deferred = {}
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def throttled(self, domain):
+        if domain not in self.throttle:
+            return False
+        limit, seconds = self.throttle[domain]
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows[domain]
+            while window and window[0] <= now - seconds:
+                window.popleft()
+            if len(window) >= limit:
+                self.deferred[domain] = self.deferred.get(domain, 0) + 1
+                return True
+            window.append(now)
+            return False
+
+    def inject_error(self):
+        if not self.error_rate:
+            return False
+        with self.lock:
+            if self.random.random() >= self.error_rate:
+                return False
+            self.errors += 1
+            return True
+
+    def delivered(self):
+        with self.lock:
+            self.count += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
@@ -0,0 +1,5 @@
+import sys
+
+from navyanta.cli import main
+
+sys.exit(main())
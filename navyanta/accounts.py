@@ -0,0 +1,281 @@
+import asyncio
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from navyanta.aiosmtp import open_smtp_async
+from navyanta.connection import open_smtp
+
+USAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS account_usage (
+    account TEXT NOT NULL,
+    minute INTEGER NOT NULL,
+    sent INTEGER NOT NULL,
+    PRIMARY KEY (account, minute)
+) WITHOUT ROWID;
+"""
+
+DAY = 24 * 60
+HOUR = 60
+
+
+class QuotaExhausted(smtplib.SMTPResponseException):
+    # Raised before sending, so it classifies like a relay quota reply and gets requeued.
+    def __init__(self, detail="4.5.3 Sender account quota reached"):
+        super().__init__(452, detail)
+
+
+# ================= ACCOUNTS =================
+class SenderAccount:
+    def __init__(self, email, password, host="smtp.gmail.com", port=587, daily_quota=0, hourly_quota=0, use_tls=True):
+        self.email = email
+        self.password = password
+        self.host = host
+        self.port = int(port)
+        self.daily_quota = int(daily_quota or 0)
+        self.hourly_quota = int(hourly_quota or 0)
+        self.use_tls = use_tls
+
+
+def load_accounts(secrets, default_host, default_port, daily_quota=0, hourly_quota=0):
+    # secrets.toml either lists [[SENDER_ACCOUNTS]] tables (email, password and optional
+    # host, port, daily_quota, hourly_quota) or has the single SENDER_EMAIL / EMAIL_PASSWORD pair.
+    entries = secrets.get("SENDER_ACCOUNTS") or []
+    if not entries and secrets.get("SENDER_EMAIL"):
+        entries = [{"email": secrets.get("SENDER_EMAIL"), "password": secrets.get("EMAIL_PASSWORD", "")}]
+    return [
+        SenderAccount(
+            entry["email"],
+            entry.get("password", ""),
+            entry.get("host", default_host),
+            entry.get("port", default_port),
+            entry.get("daily_quota", daily_quota),
+            entry.get("hourly_quota", hourly_quota),
+            entry.get("use_tls", True),
+        )
+        for entry in entries
+    ]
+
+
+class AccountPool:
+    # Shared by every campaign in the process. Usage is kept per minute in SQLite for
+    # rolling hour/day windows, so quotas survive restarts, and is cached in memory.
+    # reserve() and refund() re-read the account's usage inside their write transaction,
+    # so the app and CLI runs on the same data directory count against one quota.
+    # Accounts that are rate-limited, fail to log in or cannot be reached are suspended
+    # for a while and skipped; connect() picks among usable accounts weighted by the
+    # quota they have left.
+    def __init__(self, accounts, path, suspend_seconds=900):
+        self.accounts = {a.email: a for a in accounts}
+        self.suspend_seconds = suspend_seconds
+        self.usage = {a.email: {} for a in accounts}
+        self.suspended = {}
+        self.suspend_reason = {}
+        self.throttled = {a.email: 0 for a in accounts}
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(USAGE_SCHEMA)
+        self.conn.execute("DELETE FROM account_usage WHERE minute <= ?", (self._minute() - DAY,))
+        for email in self.accounts:
+            self._load(email)
+
+    def _load(self, email):
+        # Replaces the cached usage with what every process has recorded (lock held).
+        rows = self.conn.execute(
+            "SELECT minute, sent FROM account_usage WHERE account = ? AND minute > ?", (email, self._minute() - DAY)
+        ).fetchall()
+        self.usage[email] = dict(rows)
+
+    @contextmanager
+    def _writing(self):
+        # One write transaction, taken before reading so no other process can slip a
+        # send in between the check and the count.
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def _minute(self):
+        return int(time.time() // 60)
+
+    def _used(self, email, minutes):
+        since = self._minute() - minutes
+        return sum(n for m, n in self.usage[email].items() if m > since)
+
+    def remaining(self, email):
+        # Sends left before either quota is hit; None means unlimited.
+        account = self.accounts[email]
+        left = []
+        if account.daily_quota:
+            left.append(account.daily_quota - self._used(email, DAY))
+        if account.hourly_quota:
+            left.append(account.hourly_quota - self._used(email, HOUR))
+        return max(0, min(left)) if left else None
+
+    def usable(self, email):
+        with self.lock:
+            if self.suspended.get(email, 0) > time.time():
+                return False
+            self._load(email)
+            return self.remaining(email) != 0
+
+    def _ranked(self):
+        with self.lock:
+            now = time.time()
+            candidates = []
+            for email in self.accounts:
+                if self.suspended.get(email, 0) > now:
+                    continue
+                self._load(email)
+                left = self.remaining(email)
+                if left != 0:
+                    candidates.append((float("inf") if left is None else left, email))
+        if not candidates:
+            return []
+        # Spread new sessions in proportion to remaining quota, best first for fallback.
+        candidates.sort(reverse=True)
+        finite = sum(left for left, _ in candidates if left != float("inf")) or 1
+        weights = [finite if left == float("inf") else left for left, _ in candidates]
+        first = random.choices(range(len(candidates)), weights=weights)[0]
+        order = [candidates[first]] + candidates[:first] + candidates[first + 1:]
+        return [self.accounts[email] for _, email in order]
+
+    def _connect_failed(self, account, last):
+        # Refused, timed out or TLS failure: move on to the next account. The last one
+        # is not suspended, so a relay-wide outage is left to the retries and breaker
+        # instead of pausing the campaign for suspend_seconds.
+        if not last:
+            self.suspend(account.email, "connection failed")
+
+    def connect(self, timeout):
+        ranked = self._ranked()
+        if not ranked:
+            raise QuotaExhausted("4.5.3 Every sender account is at its quota or suspended")
+        last_error = None
+        for account in ranked:
+            try:
+                # No password means an unauthenticated relay (e.g. a local MTA).
+                username = account.email if account.password else None
+                server = open_smtp(account.host, account.port, timeout, username, account.password, account.use_tls)
+            except smtplib.SMTPAuthenticationError as e:
+                self.suspend(account.email, "login failed", self.suspend_seconds * 4)
+                last_error = e
+                continue
+            except (smtplib.SMTPException, OSError) as e:
+                self._connect_failed(account, account is ranked[-1])
+                last_error = e
+                continue
+            server.account = account
+            return server
+        raise last_error
+
+    async def connect_async(self, timeout):
+        # connect() for the asyncio engine: same account choice, an AsyncSMTP session.
+        ranked = await asyncio.to_thread(self._ranked)
+        if not ranked:
+            raise QuotaExhausted("4.5.3 Every sender account is at its quota or suspended")
+        last_error = None
+        for account in ranked:
+            try:
+                username = account.email if account.password else None
+                server = await open_smtp_async(account.host, account.port, timeout, username, account.password, account.use_tls)
+            except smtplib.SMTPAuthenticationError as e:
+                self.suspend(account.email, "login failed", self.suspend_seconds * 4)
+                last_error = e
+                continue
+            except (smtplib.SMTPException, OSError) as e:
+                self._connect_failed(account, account is ranked[-1])
+                last_error = e
+                continue
+            server.account = account
+            return server
+        raise last_error
+
+    def reserve(self, email):
+        # Counts a send against the account before it goes out.
+        with self._writing():
+            self._load(email)
+            if self.remaining(email) == 0:
+                return False
+            minute = self._minute()
+            bucket = self.usage[email]
+            bucket[minute] = bucket.get(minute, 0) + 1
+            self.conn.execute(
+                "INSERT INTO account_usage (account, minute, sent) VALUES (?, ?, 1) "
+                "ON CONFLICT (account, minute) DO UPDATE SET sent = sent + 1",
+                (email, minute),
+            )
+            return True
+
+    def refund(self, email):
+        # The relay did not accept the message, so it does not count against the quota.
+        with self._writing():
+            self._load(email)
+            bucket = self.usage[email]
+            minute = max(bucket, default=None)
+            if minute is None:
+                return
+            bucket[minute] -= 1
+            self.conn.execute("UPDATE account_usage SET sent = sent - 1 WHERE account = ? AND minute = ?", (email, minute))
+            if not bucket[minute]:
+                del bucket[minute]
+                self.conn.execute("DELETE FROM account_usage WHERE account = ? AND minute = ?", (email, minute))
+
+    def suspend(self, email, reason, seconds=None):
+        with self.lock:
+            self.suspended[email] = time.time() + (seconds or self.suspend_seconds)
+            self.suspend_reason[email] = reason
+            if reason == "rate limited":
+                self.throttled[email] += 1
+
+    def next_available_in(self):
+        # Seconds until some account can send again (0 if one already can).
+        with self.lock:
+            now = time.time()
+            minute = self._minute()
+            waits = []
+            for email, account in self.accounts.items():
+                self._load(email)
+                wait = max(0, self.suspended.get(email, 0) - now)
+                for quota, window in ((account.daily_quota, DAY), (account.hourly_quota, HOUR)):
+                    if quota and self._used(email, window) >= quota:
+                        oldest = min(m for m in self.usage[email] if m > minute - window)
+                        wait = max(wait, (oldest + window + 1) * 60 - now)
+                waits.append(wait)
+            return min(waits) if waits else 0
+
+    def snapshot(self):
+        with self.lock:
+            now = time.time()
+            rows = []
+            for email, account in self.accounts.items():
+                self._load(email)
+                until = self.suspended.get(email, 0)
+                left = self.remaining(email)
+                if until > now:
+                    state = f"suspended ({self.suspend_reason.get(email)}, {until - now:.0f}s)"
+                elif left == 0:
+                    state = "at quota"
+                else:
+                    state = "active"
+                rows.append({
+                    "account": email,
+                    "sent_today": self._used(email, DAY),
+                    "sent_hour": self._used(email, HOUR),
+                    "remaining": left,
+                    "throttled": self.throttled[email],
+                    "state": state,
+                })
+            return rows
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,215 @@
+import asyncio
+import base64
+import re
+import smtplib
+import socket
+import time
+
+from navyanta.connection import TLS_SESSIONS, ManagedConnection
+
+_LEADING_DOT = re.compile(rb"(?m)^\.")
+
+
+# ================= ASYNC SMTP CLIENT =================
+class AsyncSMTP:
+    # The part of smtplib.SMTP the senders use (EHLO, STARTTLS, AUTH, sendmail, NOOP,
+    # QUIT) over asyncio streams. Failures raise the same smtplib exceptions, so
+    # failures.classify() sees no difference between the two engines.
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.esmtp_features = {}
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        code, msg = await self.getreply()
+        if code != 220:
+            self.close()
+            raise smtplib.SMTPConnectError(code, msg)
+        return code, msg
+
+    async def getreply(self):
+        lines = []
+        code = -1
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not line:
+                self.close()
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            lines.append(line[4:].strip(b" \t\r\n"))
+            try:
+                code = int(line[:3])
+            except ValueError:
+                code = -1
+                break
+            if line[3:4] != b"-":
+                break
+        return code, b"\n".join(lines)
+
+    async def _write(self, data):
+        if self.writer is None:
+            raise smtplib.SMTPServerDisconnected("please run connect() first")
+        self.writer.write(data)
+        await asyncio.wait_for(self.writer.drain(), self.timeout)
+
+    async def docmd(self, cmd):
+        await self._write(cmd.encode("ascii") + b"\r\n")
+        return await self.getreply()
+
+    async def ehlo(self):
+        code, msg = await self.docmd(f"EHLO {socket.getfqdn()}")
+        if code != 250:
+            code, msg = await self.docmd(f"HELO {socket.getfqdn()}")
+            if code != 250:
+                raise smtplib.SMTPHeloError(code, msg)
+            return code, msg
+        self.esmtp_features = {}
+        for line in msg.decode("latin-1").split("\n")[1:]:
+            name, _, params = line.partition(" ")
+            self.esmtp_features[name.lower()] = params.strip()
+        return code, msg
+
+    def has_extn(self, name):
+        return name.lower() in self.esmtp_features
+
+    async def starttls(self, context=None):
+        if not self.has_extn("starttls"):
+            raise smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+        code, msg = await self.docmd("STARTTLS")
+        if code != 220:
+            raise smtplib.SMTPResponseException(code, msg)
+        await asyncio.wait_for(self.writer.start_tls(context or TLS_SESSIONS.context, server_hostname=self.host), self.timeout)
+        self.esmtp_features = {}
+        return code, msg
+
+    async def login(self, user, password):
+        mechanisms = self.esmtp_features.get("auth", "").upper().split()
+        if "PLAIN" in mechanisms:
+            token = base64.b64encode(f"\0{user}\0{password}".encode()).decode("ascii")
+            code, msg = await self.docmd(f"AUTH PLAIN {token}")
+        elif "LOGIN" in mechanisms:
+            code, msg = await self.docmd("AUTH LOGIN")
+            for value in (user, password):
+                if code != 334:
+                    break
+                code, msg = await self.docmd(base64.b64encode(value.encode()).decode("ascii"))
+        else:
+            raise smtplib.SMTPNotSupportedError("No suitable authentication method found.")
+        if code not in (235, 503):
+            raise smtplib.SMTPAuthenticationError(code, msg)
+        return code, msg
+
+    async def noop(self):
+        return await self.docmd("NOOP")
+
+    async def rset(self):
+        return await self.docmd("RSET")
+
+    async def sendmail(self, from_addr, to_addr, msg):
+        # One recipient, like send_email(); msg is already CRLF-terminated bytes.
+        code, resp = await self.docmd(f"MAIL FROM:<{from_addr}>")
+        if code != 250:
+            await self._reset_after(code)
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+        code, resp = await self.docmd(f"RCPT TO:<{to_addr}>")
+        if code not in (250, 251):
+            await self._reset_after(code)
+            raise smtplib.SMTPRecipientsRefused({to_addr: (code, resp)})
+        code, resp = await self.docmd("DATA")
+        if code != 354:
+            await self._reset_after(code)
+            raise smtplib.SMTPDataError(code, resp)
+        data = _LEADING_DOT.sub(b"..", msg)
+        if not data.endswith(b"\r\n"):
+            data += b"\r\n"
+        await self._write(data + b".\r\n")
+        code, resp = await self.getreply()
+        if code != 250:
+            await self._reset_after(code)
+            raise smtplib.SMTPDataError(code, resp)
+        return {}
+
+    async def _reset_after(self, code):
+        # As smtplib does: a 421 means the server is closing, anything else gets an RSET.
+        if code == 421:
+            self.close()
+            return
+        try:
+            await self.rset()
+        except (smtplib.SMTPServerDisconnected, OSError, asyncio.TimeoutError):
+            pass
+
+    async def quit(self):
+        try:
+            return await self.docmd("QUIT")
+        finally:
+            self.close()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+
+async def open_smtp_async(host, port, timeout, username=None, password=None, use_tls=True, sessions=TLS_SESSIONS):
+    # open_smtp() for the asyncio engine. asyncio's start_tls cannot resume a TLS
+    # session, so every session here is a full handshake.
+    server = AsyncSMTP(host, port, timeout)
+    await server.connect()
+    try:
+        await server.ehlo()
+        if use_tls:
+            await server.starttls(sessions.context)
+            await server.ehlo()
+        if username:
+            await server.login(username, password)
+    except BaseException:
+        server.close()
+        raise
+    return server
+
+
+# ================= MANAGED CONNECTIONS =================
+class AsyncManagedConnection(ManagedConnection):
+    # ManagedConnection over AsyncSMTP: the same reuse, probe and drop rules, awaited.
+    # connect is a coroutine function.
+    async def open(self):
+        start = time.monotonic()
+        self.server = await self.connect()
+        return self._opened(start)
+
+    async def acquire(self):
+        if self.server is not None and self.keep and not self.keep(self.server):
+            await self.drop("switched")
+        if self.server is not None and time.monotonic() - self.last_used > self.probe_idle:
+            if not await self._probe():
+                await self.drop("probe failed")
+        if self.server is None:
+            await self.open()
+        return self.server
+
+    async def _probe(self):
+        start = time.monotonic()
+        try:
+            code, _ = await self.server.noop()
+            ok = code == 250
+        except Exception:
+            ok = False
+        return self._probed(start, ok)
+
+    async def drop(self, reason):
+        self._dropped(reason)
+        await self.close()
+
+    async def close(self):
+        if self.server is None:
+            return
+        try:
+            await self.server.quit()
+        except Exception:
+            pass
+        self.server = None
@@ -0,0 +1,191 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from navyanta.aiosmtp import AsyncManagedConnection
+from navyanta.failures import AUTH, CONNECTION, DEFERRED
+from navyanta.sender import _DONE, SenderPool
+
+
+# ================= ASYNC WORKER POOL =================
+class AsyncSenderPool(SenderPool):
+    # SenderPool with its `size` workers as coroutines on one event loop, each owning an
+    # AsyncSMTP session, so hundreds of sessions can overlap their network waits.
+    # connect() and send(server, email) are coroutine functions; the rate limit, breaker,
+    # retries, requeues, deferrals and claim/release work exactly as in SenderPool.
+    # The recipient iterator is read on a feeder thread into a bounded queue, so at most
+    # size * 2 recipients wait beyond the ones in flight. Everything that writes to
+    # SQLite runs off the loop: record() and deferrals (which release the ledger claim)
+    # on one helper thread, and polls of a rate-limited bucket (a write transaction
+    # when the budget is shared) on the default executor.
+    def run(self, recipients):
+        self.unsent = []
+        self.feed_error = None
+        self.requeued.clear()
+        self.requeue_counts = {}
+        self.breaker.release_probe()
+        self.loop = asyncio.new_event_loop()
+        self.recorder = ThreadPoolExecutor(1, thread_name_prefix="record")
+        outbox = queue.Queue()
+        thread = threading.Thread(target=self._run_loop, args=(recipients, outbox), daemon=True)
+        thread.start()
+
+        live = self.size
+        try:
+            while live:
+                item = outbox.get()
+                if item is _DONE:
+                    live -= 1
+                    continue
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+            if self.feed_error:
+                raise self.feed_error
+        finally:
+            self.stop_event.set()
+            thread.join()
+            self.recorder.shutdown()
+            self.unsent.extend(self.requeued)
+            self.requeued.clear()
+            if self.release and self.unsent:
+                self.release(self.unsent)
+
+    def _run_loop(self, recipients, outbox):
+        try:
+            self.loop.run_until_complete(self._main(recipients, outbox))
+        except BaseException as e:
+            outbox.put(e)
+        finally:
+            self.loop.close()
+
+    async def _main(self, recipients, outbox):
+        self.inbox = asyncio.Queue(maxsize=self.size * 2)
+        # Connect up front so SMTP/auth errors surface to the caller before any send.
+        conns = [AsyncManagedConnection(self.connect, self.conn_stats, self.probe_idle, self.keep, self.metrics) for _ in range(self.size)]
+        opened = await asyncio.gather(*(conn.open() for conn in conns), return_exceptions=True)
+        failed = [e for e in opened if isinstance(e, BaseException)]
+        if failed:
+            await asyncio.gather(*(conn.close() for conn in conns))
+            outbox.put(failed[0])
+            return
+
+        feeder = threading.Thread(target=self._feed, args=(recipients, self.inbox), daemon=True)
+        feeder.start()
+        await asyncio.gather(*(self._work_async(self.stats[i], conn, outbox) for i, conn in enumerate(conns)))
+        # Workers only finish early when stopped; the feeder notices within one put timeout.
+        self.stop_event.set()
+        await asyncio.to_thread(feeder.join)
+        while not self.inbox.empty():
+            item = self.inbox.get_nowait()
+            if item is not _DONE:
+                self.unsent.append(item)
+
+    def _put(self, q, item):
+        # Called on the feeder thread: hands one item to the loop's queue, waiting while it is full.
+        while not self.stop_event.is_set():
+            future = asyncio.run_coroutine_threadsafe(asyncio.wait_for(q.put(item), 0.2), self.loop)
+            try:
+                future.result()
+                return True
+            except (asyncio.TimeoutError, TimeoutError):
+                pass
+        return False
+
+    async def _sleep(self, seconds):
+        # True if the pool was stopped before `seconds` passed.
+        end = time.monotonic() + seconds
+        while not self.stop_event.is_set():
+            left = end - time.monotonic()
+            if left <= 0:
+                return False
+            await asyncio.sleep(min(left, 0.2))
+        return True
+
+    async def _until(self, poll, offload=False):
+        # Awaitable TokenBucket.acquire() / CircuitBreaker.wait(): False if stopped first.
+        while True:
+            wait = await asyncio.to_thread(poll) if offload else poll()
+            if not wait:
+                return True
+            if await self._sleep(wait):
+                return False
+
+    async def _next_async(self, finishing):
+        try:
+            return self.requeued.popleft()
+        except IndexError:
+            pass
+        if finishing:
+            return _DONE
+        try:
+            return await asyncio.wait_for(self.inbox.get(), 0.2)
+        except (asyncio.TimeoutError, TimeoutError):
+            return None
+
+    async def _work_async(self, stats, conn, outbox):
+        finishing = False
+        try:
+            while not self.stop_event.is_set():
+                email = await self._next_async(finishing)
+                if email is None:
+                    continue
+                if email is _DONE:
+                    # Exit only once the list is exhausted and nothing is waiting to be retried.
+                    if self.requeued:
+                        finishing = True
+                        continue
+                    break
+                with self.metrics.time("rate_wait"):
+                    acquired = await self._until(self.bucket.poll, offload=bool(self.bucket.rate))
+                if not acquired:
+                    self.unsent.append(email)
+                    break
+
+                send_start = time.monotonic()
+                errors = []
+                success = False
+                category = None
+                attempt = 0
+                for attempt in range(1, self.retry_count + 1):
+                    with self.metrics.time("breaker_wait"):
+                        closed = await self._until(self.breaker.poll)
+                    if not closed:
+                        break
+                    try:
+                        await self.send(await conn.acquire(), email)
+                        conn.used()
+                        success = True
+                        self.breaker.record_success()
+                        break
+                    except Exception as e:
+                        category = self._attempt_failed(email, attempt, e, errors)
+                        if category in (CONNECTION, AUTH):
+                            await conn.drop(category)
+                        delay = self._retry_delay(category, attempt)
+                        if delay is None:
+                            break
+                        with self.metrics.time("retry_sleep"):
+                            interrupted = await self._sleep(delay)
+                        if interrupted:
+                            break
+
+                if not success and self.stop_event.is_set():
+                    # Interrupted mid-retry: leave it unrecorded so a resume picks it up.
+                    self.unsent.append(email)
+                    break
+                settle = (stats, conn, email, success, errors, category, attempt, time.monotonic() - send_start)
+                if not success and category == DEFERRED and self.defer:
+                    result = await self.loop.run_in_executor(self.recorder, self._settle, *settle)
+                else:
+                    result = self._settle(*settle)
+                if result is None:
+                    continue
+                if self.record:
+                    await self.loop.run_in_executor(self.recorder, self.record, result)
+                outbox.put(result)
+        finally:
+            await conn.close()
+            outbox.put(_DONE)
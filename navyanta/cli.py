@@ -0,0 +1,141 @@
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+# Only argparse and the standard library at import time: `--help` and argument errors
+# return without loading the engine, pandas or openpyxl.
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m navyanta", description="Run Navyanta email campaigns without the Streamlit UI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    send = sub.add_parser("send", help="Send a campaign to a recipient list.")
+    send.add_argument("--campaign", required=True, help="Campaign name; the same name resumes the same ledger history as the UI.")
+    send.add_argument("--recipients", required=True, help="Recipient list (.xlsx, .csv or .parquet).")
+    send.add_argument("--subject", required=True)
+    body = send.add_mutually_exclusive_group()
+    body.add_argument("--body", default="", help="Body text.")
+    body.add_argument("--body-file", help="Read the body text from this file.")
+    send.add_argument("--creative", help="Image to embed under the body.")
+    send.add_argument("--config", help="TOML or JSON file with CONFIG overrides.")
+    send.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"), help="Secrets file with sender accounts.")
+    send.add_argument("--data-dir", default="data")
+    send.add_argument("--logs-dir", default="logs")
+    history = send.add_mutually_exclusive_group()
+    history.add_argument("--resume", action="store_true", help="Skip recipients this campaign already sent to.")
+    history.add_argument("--fresh", action="store_true", help="Delete this campaign's history and start over.")
+    send.add_argument("--progress-every", type=float, default=10, help="Seconds between progress lines (0 to disable).")
+
+    export = sub.add_parser("export", help="Write one campaign's sent or failed emails to a CSV file.")
+    export.add_argument("--campaign", required=True)
+    export.add_argument("--kind", choices=["sent", "failed"], default="sent")
+    export.add_argument("--out", required=True, help="CSV file to write.")
+    export.add_argument("--data-dir", default="data")
+    return parser
+
+
+def _print_progress(job, every, done):
+    while not done.wait(every):
+        print(
+            f"[{job.state}] {job.processed()}/{job.total} processed · {job.sent} sent · "
+            f"{job.skipped} skipped · {job.failed} failed · {job.speed():.1f}/min",
+            flush=True,
+        )
+
+
+def send_campaign(args):
+    from navyanta.config import load_config, load_secrets
+    from navyanta.engine import Engine
+    from navyanta.worker import CampaignJob
+
+    config = load_config(args.config)
+    engine = Engine(config, load_secrets(args.secrets), data_dir=args.data_dir, logs_dir=args.logs_dir)
+
+    if engine.has_sent_emails(args.campaign) and not (args.resume or args.fresh):
+        print(f"Campaign '{args.campaign}' already has sent records. Pass --resume or --fresh.", file=sys.stderr)
+        return 2
+
+    body = args.body
+    if args.body_file:
+        with open(args.body_file, "r", encoding="utf-8") as f:
+            body = f.read()
+    image_bytes = None
+    if args.creative:
+        with open(args.creative, "rb") as f:
+            image_bytes = f.read()
+
+    with open(args.recipients, "rb") as source:
+        recipients, rejects_path = engine.ingest(source, args.recipients)
+    try:
+        engine.check_merge_fields(body, recipients)
+        template = engine.build_message_template(args.subject, body, image_bytes)
+        # History is only deleted once the list and the body have been validated.
+        if args.fresh:
+            engine.delete_campaign_records(args.campaign)
+    except BaseException:
+        recipients.close()
+        os.remove(recipients.path)
+        raise
+    summary = recipients.summary()
+    print(f"{summary['valid']} valid recipients from {summary['raw_rows']} rows · {summary['rejected']} rejected · {summary['role_accounts']} role accounts")
+    if rejects_path:
+        print(f"Rejected rows: {rejects_path}")
+
+    campaign_id = engine.get_campaign_id(args.campaign)
+    job = CampaignJob(campaign_id, args.campaign, None, recipients.path)
+
+    def interrupt(signum, frame):
+        # First Ctrl-C stops cleanly (unsent claims are released for a later --resume).
+        print("Stopping after in-flight sends...", file=sys.stderr, flush=True)
+        job.stop()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, interrupt)
+    signal.signal(signal.SIGTERM, interrupt)
+
+    done = threading.Event()
+    if args.progress_every > 0:
+        threading.Thread(target=_print_progress, args=(job, args.progress_every, done), daemon=True).start()
+    job.state = "running"
+    job.started = time.time()
+    try:
+        status = engine.run_campaign(job, recipients, template)
+    finally:
+        job.finished = time.time()
+        done.set()
+        engine.ledger.flush()
+
+    print(f"{status}: {job.sent} sent · {job.skipped} skipped · {job.failed} failed")
+    if job.report_path:
+        print(f"Report: {job.report_path}")
+    if job.metrics_path:
+        print(f"Timing summary: {job.metrics_path}")
+    return 0 if status == "Completed" else 130
+
+
+def export_campaign(args):
+    from navyanta.ledger import LedgerStore
+
+    ledger = LedgerStore(os.path.join(args.data_dir, "ledger.db"))
+    try:
+        count = ledger.export_csv(args.kind, args.out, args.campaign)
+    finally:
+        ledger.close()
+    print(f"{count} rows written to {args.out}")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "send":
+            return send_campaign(args)
+        if args.command == "export":
+            return export_campaign(args)
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+    return 1
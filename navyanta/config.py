@@ -0,0 +1,86 @@
+import json
+import os
+
+# ================= CONFIG =================
+CONFIG = {
+    "POOL_SIZE": 2,
+    "SEND_ENGINE": "threads", # "asyncio": one event loop with ASYNC_SESSIONS SMTP sessions, for relays that accept many
+    "ASYNC_SESSIONS": 50,
+    "RATE_PER_MINUTE": 20,
+    "RATE_BURST": 1,
+    "PROBE_IDLE_SECONDS": 15, # NOOP-probe a connection before reuse after this much idle time
+    "SMTP_TIMEOUT": 30,
+    "RETRY_COUNT": 3,
+    "RETRY_DELAY": 5, # base of the jittered exponential backoff
+    "RETRY_MAX_DELAY": 60,
+    "MAX_REQUEUES": 3, # times a recipient is retried later after relay-level failures
+    "BREAKER_THRESHOLD": 5, # consecutive relay failures before sending is paused
+    "BREAKER_COOLDOWN": 60,
+    "BREAKER_MAX_COOLDOWN": 900,
+    "DOMAIN_RATE_PER_MINUTE": 0, # per recipient domain, 0 = no cap beyond RATE_PER_MINUTE
+    "DOMAIN_RATE_OVERRIDES": {}, # e.g. {"gmail.com": 10}
+    "DOMAIN_WEIGHTS": {}, # turns per round-robin pass, default 1
+    "DOMAIN_BACKOFF": 30, # first backoff when a domain defers (4xx at RCPT), doubles per deferral
+    "DOMAIN_MAX_BACKOFF": 900,
+    "CHECKPOINT_SECONDS": 2, # how often the resume position is saved while sending
+    "MAX_DEFERS": 5, # deferrals per recipient before it is marked failed
+    "SCHEDULER_WINDOW": 5000, # recipients buffered for interleaving
+    "LEDGER_DURABILITY": "strict", # strict: fsync every row; group: batched commits (see README)
+    "LEDGER_FLUSH_INTERVAL_MS": 200,
+    "LEDGER_FLUSH_ROWS": 100,
+    "MAX_CONCURRENT_CAMPAIGNS": 3, # campaigns sending at once; they share RATE_PER_MINUTE and the sender accounts
+    "CAMPAIGN_LEASE_SECONDS": 30, # a crashed run's campaign lock expires after this long
+    "ACCOUNT_DAILY_QUOTA": 500, # default per sender account (rolling 24h); Workspace accounts allow 2000
+    "ACCOUNT_HOURLY_QUOTA": 0, # 0 = no hourly cap
+    "ACCOUNT_SUSPEND_SECONDS": 900, # how long a rate-limited account is skipped
+    "INGEST_CHUNK_ROWS": 50000,
+    "RECIPIENT_LIST_TTL_HOURS": 72,
+    "DISPOSABLE_DOMAINS_FILE": os.path.join("data", "disposable_domains.txt"), # optional, one domain per line
+    "REJECT_ROLE_ACCOUNTS": False, # role accounts (info@, hr@, ...) are flagged; set True to reject them
+    "CREATIVE_OPTIMIZE": True, # resize/recompress uploaded creatives (needs Pillow; skipped without it)
+    "CREATIVE_MAX_WIDTH": 1200, # px: the email shows it at up to 600 px, twice that for high-DPI screens
+    "CREATIVE_JPEG_QUALITY": 85,
+    "METRICS_TEXTFILE": "metrics.prom", # Prometheus text format, relative to the data directory; "" to disable
+    "METRICS_PORT": 0, # serve the same text at http://127.0.0.1:<port>/metrics, 0 = off
+    "METRICS_INTERVAL": 15, # seconds between textfile rewrites
+    "PROGRESS_REFRESH_SECONDS": 1, # campaign progress redraw interval in the UI, at least 0.25
+}
+
+SMTP_SERVER = "smtp.gmail.com"
+SMTP_PORT = 587
+CTA_URL = "https://forms.gle/1ePgB5GQCX9cyhmU9"
+PREHEADER_TEXT = "🚀 Job Opportunity at Autoline Industries | Apply through Navyanta Group."
+
+# ================= STORAGE =================
+DATA_DIR = "data"
+LOGS_DIR = "logs"
+SECRETS_FILE = os.path.join(".streamlit", "secrets.toml")
+
+
+def _read_file(path):
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    import tomllib
+
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def load_config(path=None):
+    # CONFIG with the keys from a TOML or JSON file laid over it.
+    config = dict(CONFIG)
+    if path:
+        overrides = _read_file(path)
+        unknown = sorted(set(overrides) - set(CONFIG))
+        if unknown:
+            raise ValueError(f"Unknown config keys in {path}: {', '.join(unknown)}")
+        config.update(overrides)
+    return config
+
+
+def load_secrets(path=SECRETS_FILE):
+    # The same secrets.toml the Streamlit app reads, for runs outside Streamlit.
+    if not path or not os.path.exists(path):
+        return {}
+    return _read_file(path)
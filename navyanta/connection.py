@@ -0,0 +1,163 @@
+import smtplib
+import ssl
+import threading
+import time
+
+from navyanta.metrics import Metrics
+
+
+# ================= TLS SESSION REUSE =================
+class SessionSMTP(smtplib.SMTP):
+    # smtplib.SMTP.starttls() without a way to pass a TLS session; this mirrors it and
+    # adds one, so reconnects to the same relay can resume instead of full handshakes.
+    def starttls(self, context=None, session=None):
+        self.ehlo_or_helo_if_needed()
+        if not self.has_extn("starttls"):
+            raise smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+        resp, reply = self.docmd("STARTTLS")
+        if resp != 220:
+            raise smtplib.SMTPResponseException(resp, reply)
+        context = context or ssl.create_default_context()
+        self.sock = context.wrap_socket(self.sock, server_hostname=self._host, session=session)
+        self.file = None
+        self.helo_resp = None
+        self.ehlo_resp = None
+        self.esmtp_features = {}
+        self.does_esmtp = False
+        return resp, reply
+
+
+class TLSSessionCache:
+    def __init__(self):
+        self.context = ssl.create_default_context()
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, host):
+        with self.lock:
+            return self.sessions.get(host)
+
+    def put(self, host, session):
+        if session is not None:
+            with self.lock:
+                self.sessions[host] = session
+
+
+TLS_SESSIONS = TLSSessionCache()
+
+
+def open_smtp(host, port, timeout, username=None, password=None, use_tls=True, sessions=TLS_SESSIONS):
+    server = SessionSMTP(host, port, timeout=timeout)
+    server.ehlo()
+    if use_tls:
+        server.starttls(context=sessions.context, session=sessions.get(host))
+        server.ehlo()
+        sessions.put(host, server.sock.session)
+    if username:
+        server.login(username, password)
+    return server
+
+
+# ================= MANAGED CONNECTIONS =================
+class ConnectionStats:
+    def __init__(self):
+        self.handshakes = 0
+        self.handshake_seconds = 0.0
+        self.tls_resumed = 0
+        self.probes = 0
+        self.probe_failures = 0
+        self.drops = {}
+        self.lock = threading.Lock()
+
+    def avg_handshake_ms(self):
+        return self.handshake_seconds / self.handshakes * 1000 if self.handshakes else 0
+
+    def record_handshake(self, seconds, resumed):
+        with self.lock:
+            self.handshakes += 1
+            self.handshake_seconds += seconds
+            self.tls_resumed += 1 if resumed else 0
+
+    def record_probe(self, ok):
+        with self.lock:
+            self.probes += 1
+            self.probe_failures += 0 if ok else 1
+
+    def record_drop(self, reason):
+        with self.lock:
+            self.drops[reason] = self.drops.get(reason, 0) + 1
+
+
+class ManagedConnection:
+    # One long-lived SMTP session per worker. It is only rebuilt when a send fails at
+    # the connection level, the server says it is closing (421), or a NOOP probe after
+    # probe_idle seconds of inactivity finds it dead, or keep(server) says it should
+    # not be used any more (e.g. its sender account is out of quota).
+    def __init__(self, connect, stats=None, probe_idle=15, keep=None, metrics=None):
+        self.connect = connect
+        self.keep = keep
+        self.stats = stats or ConnectionStats()
+        self.metrics = metrics or Metrics()
+        self.probe_idle = probe_idle
+        self.server = None
+        self.opens = 0
+        self.last_used = 0.0
+
+    def open(self):
+        start = time.monotonic()
+        self.server = self.connect()
+        return self._opened(start)
+
+    def _opened(self, start):
+        sock = getattr(self.server, "sock", None)
+        elapsed = time.monotonic() - start
+        self.stats.record_handshake(elapsed, getattr(sock, "session_reused", False))
+        self.metrics.observe("handshake", elapsed)
+        self.opens += 1
+        self.last_used = time.monotonic()
+        return self.server
+
+    def acquire(self):
+        if self.server is not None and self.keep and not self.keep(self.server):
+            self.drop("switched")
+        if self.server is not None and time.monotonic() - self.last_used > self.probe_idle:
+            if not self._probe():
+                self.drop("probe failed")
+        if self.server is None:
+            self.open()
+        return self.server
+
+    def _probe(self):
+        start = time.monotonic()
+        try:
+            code, _ = self.server.noop()
+            ok = code == 250
+        except Exception:
+            ok = False
+        return self._probed(start, ok)
+
+    def _probed(self, start, ok):
+        self.metrics.observe("probe", time.monotonic() - start)
+        self.stats.record_probe(ok)
+        return ok
+
+    def used(self):
+        self.last_used = time.monotonic()
+
+    def drop(self, reason):
+        self._dropped(reason)
+        self.close()
+
+    def _dropped(self, reason):
+        if self.server is not None:
+            self.stats.record_drop(reason)
+            self.metrics.inc("reconnects", reason=reason)
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        self.server = None
@@ -0,0 +1,139 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from email.mime.nonmultipart import MIMENonMultipart
+
+_SIGNATURES = ((b"\x89PNG\r\n\x1a\n", "png"), (b"\xff\xd8\xff", "jpeg"), (b"GIF8", "gif"))
+
+
+def image_subtype(data):
+    for signature, subtype in _SIGNATURES:
+        if data.startswith(signature):
+            return subtype
+    return "png"
+
+
+def pillow_available():
+    try:
+        import PIL.Image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def optimize_image(data, max_width, jpeg_quality):
+    # Resizes to at most max_width, recompresses PNG/JPEG and drops EXIF and text
+    # chunks. Needs Pillow; without it, or if the result is not smaller, the upload
+    # is used as it is.
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            kind = img.format
+            if kind not in ("PNG", "JPEG"):
+                return data
+            icc = img.info.get("icc_profile")
+            img = ImageOps.exif_transpose(img) # keep the orientation the EXIF tag asked for
+            if img.width > max_width:
+                img = img.resize((max_width, max(1, round(img.height * max_width / img.width))), Image.LANCZOS)
+            out = io.BytesIO()
+            if kind == "JPEG":
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                img.save(out, "JPEG", quality=jpeg_quality, optimize=True, progressive=True, icc_profile=icc)
+            else:
+                img.save(out, "PNG", optimize=True, icc_profile=icc)
+    except (OSError, ValueError):
+        return data
+    optimized = out.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+# ================= CREATIVES =================
+class Creative:
+    # An optimized creative with its base64 form, built once and shared by the preview,
+    # test sends and every campaign's MessageTemplate.
+    def __init__(self, digest, data, original_size=None):
+        self.digest = digest
+        self.data = data
+        self.subtype = image_subtype(data)
+        self.original_size = original_size or len(data)
+        self.encoded = base64.encodebytes(data).decode("ascii")
+        self._data_uri = None
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @property
+    def data_uri(self):
+        if self._data_uri is None:
+            self._data_uri = f"data:image/{self.subtype};base64,{self.encoded.replace(chr(10), '')}"
+        return self._data_uri
+
+    def mime_part(self):
+        # A new part each time (callers add their own headers), over the shared encoding.
+        part = MIMENonMultipart("image", self.subtype)
+        part["Content-Transfer-Encoding"] = "base64"
+        part.set_payload(self.encoded)
+        return part
+
+
+class CreativeStore:
+    # Creatives keyed by the sha256 of the uploaded bytes. Optimized images are kept
+    # under `directory`, so the same upload is optimized once across reruns, campaigns
+    # and restarts; the last `keep` are also held in memory with their encodings.
+    # Without Pillow uploads are used as they are and nothing is written.
+    def __init__(self, directory, max_width=1200, jpeg_quality=85, optimize=True, keep=8):
+        self.directory = directory
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        self.optimize = optimize and pillow_available()
+        self.keep = keep
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        # The settings are part of the name: changing them optimizes again.
+        return os.path.join(self.directory, f"{digest}-w{self.max_width}-q{self.jpeg_quality}.img")
+
+    def get(self, digest):
+        with self.lock:
+            creative = self.cache.get(digest)
+            if creative is not None:
+                self.cache.move_to_end(digest)
+            return creative
+
+    def put(self, data):
+        if isinstance(data, Creative):
+            return data
+        digest = hashlib.sha256(data).hexdigest()
+        creative = self.get(digest)
+        if creative is not None:
+            return creative
+
+        optimized = data
+        if self.optimize:
+            path = self._path(digest)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    optimized = f.read()
+            else:
+                optimized = optimize_image(data, self.max_width, self.jpeg_quality)
+                tmp = f"{path}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(optimized)
+                os.replace(tmp, path)
+        creative = Creative(digest, optimized, len(data))
+
+        with self.lock:
+            self.cache[digest] = creative
+            while len(self.cache) > self.keep:
+                self.cache.popitem(last=False)
+        return creative
@@ -0,0 +1,650 @@
+import asyncio
+import csv
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from navyanta.accounts import AccountPool, QuotaExhausted, load_accounts
+from navyanta.async_sender import AsyncSenderPool
+from navyanta.config import CONFIG, CTA_URL, DATA_DIR, LOGS_DIR, PREHEADER_TEXT, SMTP_PORT, SMTP_SERVER
+from navyanta.connection import ConnectionStats
+from navyanta.creative import CreativeStore
+from navyanta.failures import AUTH, THROTTLED, CircuitBreaker, classify
+from navyanta.history import HistoryStore, campaign_slug
+from navyanta.leases import CampaignLocks, SharedTokenBucket
+from navyanta.ledger import LedgerStore, ResumeCursor
+from navyanta.message import MessageTemplate
+from navyanta.metrics import Metrics, MetricsExporter, write_summary
+from navyanta.personalize import merge_fields
+from navyanta.progress import COALESCE_SECONDS
+from navyanta.scheduler import DomainScheduler
+from navyanta.sender import SenderPool
+
+
+# ================= LOGGING =================
+def get_logger(logs_dir=LOGS_DIR):
+    logger = logging.getLogger("navyanta")
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        formatter = logging.Formatter('%(asctime)s - %(message)s')
+
+        log_file = os.path.join(logs_dir, f"{datetime.now().strftime('%Y-%m-%d')}.log")
+        fh = logging.FileHandler(log_file)
+        fh.setFormatter(formatter)
+        logger.addHandler(fh)
+
+        sh = logging.StreamHandler()
+        sh.setFormatter(formatter)
+        logger.addHandler(sh)
+    return logger
+
+
+# ================= EMAIL BUILDER =================
+def build_email_html(body, image_cid, cta_url=CTA_URL, preheader=PREHEADER_TEXT):
+    body_html = ""
+    if body:
+        body_html = f"""
+        <p style="font-size:14px;color:#374151;line-height:1.6;">
+          {body.replace("\n", "<br>")}
+        </p>
+        """
+    img_html = ""
+    if image_cid:
+        img_html = f"""
+        <div style="text-align: center; margin-top: 20px; margin-bottom: 20px;">
+            <img src="cid:{image_cid}" alt="Recruitment Flyer" style="max-width: 100%; border-radius: 8px;">
+        </div>
+        """
+
+    return f"""
+    <html>
+      <body>
+        <div style="display:none;font-size:1px;opacity:0;">
+          {preheader}
+        </div>
+        {body_html}
+        <table role="presentation" width="100%" cellpadding="0" cellspacing="0">
+          <tr>
+            <td align="center" style="padding-top:22px; padding-bottom:22px;">
+              <table role="presentation">
+                <tr>
+                  <td bgcolor="#2563eb" style="border-radius:6px;">
+                    <a href="{cta_url}" target="_blank"
+                       style="display:inline-block;
+                              padding:14px 28px;
+                              font-size:16px;
+                              font-weight:bold;
+                              color:#ffffff;
+                              text-decoration:none;
+                              border-radius:6px;">
+                      REGISTER NOW!
+                    </a>
+                  </td>
+                </tr>
+              </table>
+            </td>
+          </tr>
+        </table>
+        {img_html}
+      </body>
+    </html>
+    """
+
+
+def send_email(server, to_email, template, metrics=None, values=None):
+    # values: the recipient's bound merge fields (MessageTemplate.bind_batch), if the body has any.
+    metrics = metrics or Metrics()
+    with metrics.time("render"):
+        data = template.render(to_email, values)
+    with metrics.time("smtp_send"):
+        server.sendmail(template.sender, to_email, data)
+    metrics.inc("bytes_sent", len(data))
+
+
+async def send_email_async(server, to_email, template, metrics=None, values=None):
+    # send_email() over an AsyncSMTP session: same rendered bytes, same stages.
+    metrics = metrics or Metrics()
+    with metrics.time("render"):
+        data = template.render(to_email, values)
+    with metrics.time("smtp_send"):
+        await server.sendmail(template.sender, to_email, data)
+    metrics.inc("bytes_sent", len(data))
+
+
+# ================= ENGINE =================
+class Engine:
+    # Everything a campaign needs apart from the UI: storage, ledger, sender accounts,
+    # message building and the send loop. The Streamlit app and the CLI each build one
+    # over the same data directory, so they share history, quotas and resume state.
+    def __init__(self, config=None, secrets=None, data_dir=DATA_DIR, logs_dir=LOGS_DIR, logger=None):
+        self.config = config or CONFIG
+        secrets = secrets if secrets is not None else {}
+        self.data_dir = data_dir
+        self.recipients_dir = os.path.join(data_dir, "recipients")
+        self.exports_dir = os.path.join(data_dir, "exports")
+        os.makedirs(data_dir, exist_ok=True)
+        os.makedirs(self.recipients_dir, exist_ok=True)
+        os.makedirs(logs_dir, exist_ok=True)
+        self.logger = logger or get_logger(logs_dir)
+        self.sender_email = secrets.get("SENDER_EMAIL", "")
+        self.creatives = CreativeStore(
+            os.path.join(data_dir, "creatives"),
+            max_width=self.config["CREATIVE_MAX_WIDTH"],
+            jpeg_quality=self.config["CREATIVE_JPEG_QUALITY"],
+            optimize=self.config["CREATIVE_OPTIMIZE"],
+        )
+
+        # The legacy CSVs are imported on first start.
+        self.ledger = LedgerStore(
+            os.path.join(data_dir, "ledger.db"),
+            durability=self.config["LEDGER_DURABILITY"],
+            flush_interval=self.config["LEDGER_FLUSH_INTERVAL_MS"] / 1000,
+            flush_rows=self.config["LEDGER_FLUSH_ROWS"],
+        )
+        self.ledger.migrate_csv(
+            os.path.join(data_dir, "sent_emails.csv"),
+            os.path.join(data_dir, "failed_emails.csv"),
+            os.path.join(data_dir, "campaign_history.csv"),
+        )
+        # Columnar history and aggregates for the dashboard, refreshed after every run.
+        self.history = HistoryStore(os.path.join(data_dir, "history"), self.ledger)
+        # Quota usage is shared by every campaign on this machine and survives restarts.
+        self.accounts = AccountPool(
+            load_accounts(secrets, SMTP_SERVER, SMTP_PORT, self.config["ACCOUNT_DAILY_QUOTA"], self.config["ACCOUNT_HOURLY_QUOTA"]),
+            os.path.join(data_dir, "accounts.db"),
+            self.config["ACCOUNT_SUSPEND_SECONDS"],
+        )
+        # Campaigns run concurrently: each holds a lease on its own name, and all of them,
+        # in this process and any other on the data directory, draw on one RATE_PER_MINUTE budget.
+        self.locks = CampaignLocks(os.path.join(data_dir, "leases.db"), self.config["CAMPAIGN_LEASE_SECONDS"])
+        self.bucket = SharedTokenBucket(os.path.join(data_dir, "leases.db"), self.config["RATE_PER_MINUTE"], self.config["RATE_BURST"])
+        # Metrics of the most recent campaigns run by this process, keyed by campaign id.
+        self.campaign_metrics = OrderedDict()
+        self.metrics_lock = threading.Lock()
+        textfile = self.config["METRICS_TEXTFILE"]
+        self.exporter = MetricsExporter(
+            self.recent_metrics,
+            textfile=os.path.join(data_dir, textfile) if textfile else "",
+            port=self.config["METRICS_PORT"],
+            interval=self.config["METRICS_INTERVAL"],
+            logger=self.logger,
+        )
+
+    # ----- ledger -----
+    def log_sent_email(self, campaign_id, campaign_name, email):
+        self.ledger.log_sent(campaign_id, campaign_name, email, datetime.now().isoformat())
+        self.logger.info(f"SENT: {email} (Campaign: {campaign_name})")
+
+    def log_failed_email(self, campaign_id, campaign_name, email, reason, category=None):
+        self.ledger.log_failed(campaign_id, campaign_name, email, reason, datetime.now().isoformat(), category)
+        self.logger.error(f"FAILED: {email} - {reason} [{category}] (Campaign: {campaign_name})")
+
+    def update_campaign_status(self, campaign_id, campaign_name, start_time, end_time, total, sent, skipped, failed, status):
+        duration = (end_time - start_time).total_seconds() if end_time else 0
+        self.ledger.log_campaign(campaign_id, campaign_name, start_time.isoformat(), end_time.isoformat() if end_time else "", total, sent, skipped, failed, duration, status)
+
+    def has_sent_emails(self, campaign_name):
+        return self.ledger.has_sent(campaign_name)
+
+    def get_campaign_id(self, campaign_name):
+        return self.ledger.campaign_id(campaign_name) or str(uuid.uuid4())
+
+    def delete_campaign_records(self, campaign_name):
+        held = self.locks.holder(campaign_name)
+        if held:
+            raise RuntimeError(f"Campaign '{campaign_name}' is running ({held[0]}); stop it before deleting its history.")
+        self.ledger.delete_campaign(campaign_name)
+        self.history.remove(campaign_name)
+
+    def export_campaign(self, campaign_name, kind):
+        # One campaign's "sent" or "failed" rows, streamed to a CSV under data/exports.
+        os.makedirs(self.exports_dir, exist_ok=True)
+        path = os.path.join(self.exports_dir, f"{kind}_{campaign_slug(campaign_name)}.csv")
+        self.ledger.export_csv(kind, path, campaign_name)
+        return path
+
+    def update_history(self, campaign_name):
+        if not self.history.available:
+            return
+        try:
+            self.history.update(campaign_name)
+        except Exception as e:
+            self.logger.warning(f"Could not update the history store for {campaign_name}: {e}")
+
+    def recent_metrics(self):
+        with self.metrics_lock:
+            return list(self.campaign_metrics.values())
+
+    def ledger_claim_batch(self):
+        # Claim about one flush interval's worth of sends at a time, capped at the flush size.
+        if not self.config["RATE_PER_MINUTE"]:
+            return self.config["LEDGER_FLUSH_ROWS"]
+        per_interval = self.config["RATE_PER_MINUTE"] / 60 * self.config["LEDGER_FLUSH_INTERVAL_MS"] / 1000
+        return max(1, min(self.config["LEDGER_FLUSH_ROWS"], int(per_interval)))
+
+    # ----- recipients -----
+    def ingest(self, source, filename, keep=()):
+        # Cleans an uploaded list into a spill under data/recipients; returns it with the
+        # path of the rejects CSV (None if nothing was rejected).
+        from navyanta.recipients import ingest_recipients, load_domain_list, prune_recipient_lists
+
+        prune_recipient_lists(self.recipients_dir, self.config["RECIPIENT_LIST_TTL_HOURS"], keep=keep)
+        upload_id = uuid.uuid4()
+        recipients_path = os.path.join(self.recipients_dir, f"{upload_id}.db")
+        rejects_path = os.path.join(self.recipients_dir, f"{upload_id}_rejects.csv")
+        recipients = ingest_recipients(
+            source,
+            filename,
+            recipients_path,
+            self.config["INGEST_CHUNK_ROWS"],
+            rejects_path=rejects_path,
+            disposable_domains=load_domain_list(self.config["DISPOSABLE_DOMAINS_FILE"]),
+            reject_role=self.config["REJECT_ROLE_ACCOUNTS"],
+        )
+        return recipients, rejects_path if os.path.exists(rejects_path) else None
+
+    def check_merge_fields(self, body, recipients):
+        # A {{field}} with no matching column would silently send its fallback to everyone.
+        missing = sorted(merge_fields(body) - set(recipients.columns))
+        if missing:
+            raise ValueError(
+                f"The email body uses {', '.join('{{' + f + '}}' for f in missing)}, but the recipient list has no such column. "
+                f"Available columns: {', '.join(recipients.columns)}"
+            )
+
+    # ----- sending -----
+    def build_message_template(self, subject, body, creative):
+        # creative: a Creative from self.creatives, raw image bytes (stored first), or None.
+        if creative:
+            creative = self.creatives.put(creative)
+        html = build_email_html(body, "creative" if creative else None)
+        return MessageTemplate(self.sender_email or next(iter(self.accounts.accounts), ""), subject, html, creative)
+
+    def send_from_account(self, server, to_email, template, metrics=None, values=None):
+        # server comes from reconnect_server(), so it knows which sender account it is logged in as.
+        accounts = self.accounts
+        account = server.account.email
+        if not accounts.reserve(account):
+            raise QuotaExhausted()
+        try:
+            send_email(server, to_email, template.for_sender(account), metrics, values)
+        except Exception as e:
+            self._account_send_failed(account, e)
+            raise
+
+    async def send_from_account_async(self, server, to_email, template, metrics=None, values=None):
+        # The quota writes go to accounts.db, so they run off the event loop.
+        accounts = self.accounts
+        account = server.account.email
+        if not await asyncio.to_thread(accounts.reserve, account):
+            raise QuotaExhausted()
+        try:
+            await send_email_async(server, to_email, template.for_sender(account), metrics, values)
+        except Exception as e:
+            await asyncio.to_thread(self._account_send_failed, account, e)
+            raise
+
+    def _account_send_failed(self, account, exc):
+        self.accounts.refund(account)
+        category, _ = classify(exc)
+        if category in (THROTTLED, AUTH):
+            self.accounts.suspend(account, "rate limited" if category == THROTTLED else "auth failed")
+
+    def reconnect_server(self):
+        return self.accounts.connect(self.config["SMTP_TIMEOUT"])
+
+    # ----- campaigns -----
+    def write_campaign_report(self, c_id, campaign_name, start_time, end_time, total, sent, skipped, failed, account_stats=None):
+        report_path = os.path.join(self.data_dir, f"report_{c_id}.csv")
+        duration_secs = (end_time - start_time).total_seconds()
+        avg_speed = (sent / duration_secs * 60) if duration_secs > 0 else 0
+        success_pct = (sent / (sent + failed)) * 100 if (sent + failed) > 0 else 0
+        fail_pct = (failed / (sent + failed)) * 100 if (sent + failed) > 0 else 0
+
+        with open(report_path, "w", newline="", encoding="utf-8") as rf:
+            writer = csv.writer(rf)
+            writer.writerow(["Campaign Name", "Campaign ID", "Started", "Completed", "Duration (s)", "Total Emails", "Sent", "Skipped", "Failed", "Average Speed (emails/min)", "Success %", "Failure %"])
+            writer.writerow([campaign_name, c_id, start_time.isoformat(), end_time.isoformat(), f"{duration_secs:.1f}", total, sent, skipped, failed, f"{avg_speed:.2f}", f"{success_pct:.1f}%", f"{fail_pct:.1f}%"])
+            if account_stats:
+                writer.writerow([])
+                writer.writerow(["Sender Account", "Sent", "Failed Attempts", "Sent Today", "Remaining Quota", "Times Throttled"])
+                usage = {row["account"]: row for row in self.accounts.snapshot()}
+                for account, counts in sorted(account_stats.items()):
+                    row = usage.get(account, {})
+                    remaining = row.get("remaining")
+                    writer.writerow([account, counts["sent"], counts["errors"], row.get("sent_today", ""), "unlimited" if remaining is None else remaining, row.get("throttled", "")])
+        return report_path
+
+    def run_campaign(self, job, recipients, template):
+        # Runs on a CampaignManager thread (or the CLI's main thread): no UI calls in
+        # here, only job state.
+        config = self.config
+        ledger = self.ledger
+        accounts = self.accounts
+        c_id = job.campaign_id
+        campaign_name = job.campaign_name
+        if not accounts.accounts:
+            raise RuntimeError("No sender accounts configured. Set SENDER_EMAIL / EMAIL_PASSWORD or SENDER_ACCOUNTS in secrets.")
+
+        def lease_lost():
+            job.log("⛔ This campaign's lease expired and another run took it over; stopping.")
+            job.stop()
+
+        # Only the lease holder touches the campaign's ledger rows, so two runs of one
+        # campaign can never both resolve its in-flight claims or send its recipients.
+        lease = self.locks.acquire(campaign_name, on_lost=lease_lost)
+        if lease is None:
+            owner, left = self.locks.holder(campaign_name) or ("another run", 0)
+            raise RuntimeError(
+                f"Campaign '{campaign_name}' is already running ({owner}). "
+                f"If that run has crashed, its lock expires in {left:.0f}s and the campaign can then be resumed."
+            )
+        if lease.reclaimed_from:
+            job.log(f"🔓 Took over the expired lock of {lease.reclaimed_from}")
+
+        start_time = datetime.now()
+        status = "Interrupted"
+        # The id keeps a fresh run's series apart from an earlier run of the same name.
+        metrics = job.metrics = Metrics(campaign=campaign_name, campaign_id=c_id)
+        with self.metrics_lock:
+            self.campaign_metrics.pop(c_id, None)
+            self.campaign_metrics[c_id] = metrics
+            while len(self.campaign_metrics) > 20:
+                self.campaign_metrics.popitem(last=False)
+        fingerprint = save_checkpoint = None
+        try:
+            resolved = ledger.resolve_in_doubt(c_id, campaign_name, alive=self.locks.alive)
+            if resolved:
+                job.log(f"⚠ {len(resolved)} emails were in flight during a crash and will not be resent (see Failed Emails)")
+            # Claims of a taken-over run that is still alive: neither resolved nor resent.
+            held = ledger.inflight_emails(campaign_name)
+            if held:
+                job.log(f"⏸ {len(held)} emails are still in flight in {lease.reclaimed_from or 'another run'}; they are skipped this run")
+            in_doubt = ledger.in_doubt_emails(campaign_name)
+
+            # Resume from the checkpoint: rows up to it all have a result, so they are
+            # skipped without being read, except earlier failures, which are retried
+            # first. Rows after it are checked against the ledger a batch at a time.
+            job.total = len(recipients)
+            fingerprint = recipients.fingerprint
+            position = ledger.checkpoint(campaign_name, fingerprint) if fingerprint else 0
+            cursor = ResumeCursor(position)
+            retry = []
+            if position:
+                retry = [email for email, seq in recipients.positions(ledger.retryable_failures(campaign_name)).items() if seq <= position and email not in held]
+                job.skipped = recipients.count_through(position) - len(retry)
+                job.log(f"⏩ Resuming after row {position:,}: skipped {job.skipped:,} recipients without rescanning them")
+            done = set()
+            positions = {}
+            scanned = position
+
+            # Merge fields are bound a batch at a time as rows are read, and kept until
+            # the recipient's result is recorded.
+            personalized = bool(template.fields)
+            merge = {}
+
+            def bind(emails, rows):
+                for email, values in zip(emails, template.bind_batch(rows)):
+                    merge[email] = values
+
+            def pending():
+                # Every pass seeks to the cursor's mark. Only rows past `scanned` add to
+                # the skip count, and a run of skips is logged as one line.
+                nonlocal scanned
+                todo = [email for email in retry if email not in done]
+                if personalized and todo:
+                    found = recipients.fields_for(todo)
+                    bind(todo, [found.get(email, {}) for email in todo])
+                yield from todo
+                for rows in recipients.iter_from(cursor.rewind(), fields=personalized):
+                    if personalized:
+                        fresh = [row for row in rows if row[1] not in done]
+                        bind([row[1] for row in fresh], [row[2] for row in fresh])
+                    sent = ledger.sent_among(campaign_name, (row[1] for row in rows if row[1] not in done))
+                    run = 0
+                    for seq, email, *_ in rows:
+                        if email in done:
+                            cursor.issue(seq, pending=False)
+                        elif email in sent or email in in_doubt or email in held:
+                            # Held rows stay pending so the checkpoint cannot pass them.
+                            cursor.issue(seq, pending=email in held)
+                            merge.pop(email, None)
+                            if seq > scanned:
+                                run += 1
+                        else:
+                            cursor.issue(seq)
+                            positions[email] = seq
+                            yield email
+                        scanned = max(scanned, seq)
+                    if run:
+                        job.skipped += run
+                        job.activity.count("skipped", lambda n: f"⏩ Skipped {n:,} already-sent recipients", run)
+
+            checkpoint_lock = threading.Lock()
+            saved = {"position": position, "time": time.monotonic()}
+
+            def save_checkpoint(force=False):
+                if not fingerprint:
+                    return
+                with checkpoint_lock:
+                    mark = cursor.mark()
+                    if mark > saved["position"] and (force or time.monotonic() - saved["time"] >= config["CHECKPOINT_SECONDS"]):
+                        ledger.save_checkpoint(campaign_name, fingerprint, mark)
+                        saved["position"] = mark
+                        saved["time"] = time.monotonic()
+
+            def record_result(result):
+                with metrics.time("ledger_write"):
+                    if result.success:
+                        self.log_sent_email(c_id, campaign_name, result.email)
+                    else:
+                        reason = result.errors[-1][2] if result.errors else "Failed after retries"
+                        self.log_failed_email(c_id, campaign_name, result.email, reason, result.category)
+                scheduler.settle(result.email, result.success)
+                merge.pop(result.email, None)
+                seq = positions.pop(result.email, None)
+                if seq is not None:
+                    cursor.resolve(seq)
+                    save_checkpoint()
+
+            def breaker_tripped(category):
+                if category == AUTH and not any(accounts.usable(a) for a in accounts.accounts):
+                    job.log("⛔ SMTP authentication failed; campaign paused. Check the sender credentials, then resume.")
+                    job.pause()
+                else:
+                    job.log(f"⛔ SMTP relay unhealthy ({category}); holding sends for {breaker.cooldown:.0f}s")
+
+            # Pausing stops the pool (closing its connections); resuming starts a new one
+            # over whatever is still pending.
+            # One breaker per campaign so relay health carries over a pause/resume.
+            breaker = CircuitBreaker(config["BREAKER_THRESHOLD"], config["BREAKER_COOLDOWN"], config["BREAKER_MAX_COOLDOWN"], on_trip=breaker_tripped)
+            conn_stats = ConnectionStats()
+            # Interleaves recipients across domains; a deferring domain is backed off alone
+            # while the rest of the list keeps flowing.
+            scheduler = DomainScheduler(
+                config["DOMAIN_RATE_PER_MINUTE"],
+                config["DOMAIN_RATE_OVERRIDES"],
+                config["DOMAIN_WEIGHTS"],
+                window=config["SCHEDULER_WINDOW"],
+                base_backoff=config["DOMAIN_BACKOFF"],
+                max_backoff=config["DOMAIN_MAX_BACKOFF"],
+                max_defers=config["MAX_DEFERS"],
+            )
+            job.scheduler = scheduler
+
+            def send(server, email):
+                counts = job.accounts.setdefault(server.account.email, {"sent": 0, "errors": 0})
+                try:
+                    self.send_from_account(server, email, template, metrics, merge.get(email))
+                except Exception:
+                    counts["errors"] += 1
+                    raise
+                counts["sent"] += 1
+
+            async def send_async(server, email):
+                counts = job.accounts.setdefault(server.account.email, {"sent": 0, "errors": 0})
+                try:
+                    await self.send_from_account_async(server, email, template, metrics, merge.get(email))
+                except Exception:
+                    counts["errors"] += 1
+                    raise
+                counts["sent"] += 1
+
+            def connect():
+                try:
+                    return self.reconnect_server()
+                except QuotaExhausted:
+                    hold_for_quota()
+                    raise
+
+            async def connect_async():
+                try:
+                    return await self.accounts.connect_async(config["SMTP_TIMEOUT"])
+                except QuotaExhausted:
+                    hold_for_quota()
+                    raise
+
+            # SEND_ENGINE "asyncio" runs ASYNC_SESSIONS sessions as coroutines on one loop.
+            if config["SEND_ENGINE"] == "asyncio":
+                pool_class, pool_connect, pool_send, pool_size = AsyncSenderPool, connect_async, send_async, config["ASYNC_SESSIONS"]
+            else:
+                pool_class, pool_connect, pool_send, pool_size = SenderPool, connect, send, config["POOL_SIZE"]
+
+            def hold_for_quota():
+                # Every sender account is at its quota or suspended: pause, and resume
+                # by ourselves once one of them can send again.
+                if job.paused():
+                    return
+                wait = accounts.next_available_in()
+                job.log(f"⏳ All sender accounts are at their quota; resuming in {wait / 60:.0f} min")
+                job.pause()
+                timer = threading.Timer(wait, job.resume)
+                timer.daemon = True
+                timer.start()
+
+            def defer(email):
+                ledger.release(campaign_name, [email])
+                if scheduler.defer(email):
+                    domain = email.rpartition("@")[2]
+                    job.activity.count(
+                        f"deferred:{domain}",
+                        lambda n: f"⏸ Deferred by {domain}: {email}" if n == 1 else f"⏸ Deferred by {domain}: {n} recipients (last {email})",
+                        window=COALESCE_SECONDS,
+                    )
+                    return True
+                return False
+
+            finished = False
+            while job.wait_if_paused():
+                if accounts.next_available_in() > 0:
+                    hold_for_quota()
+                    continue
+                pool = pool_class(
+                    pool_connect,
+                    pool_send,
+                    size=pool_size,
+                    bucket=self.bucket,
+                    record=record_result,
+                    retry_count=config["RETRY_COUNT"],
+                    retry_delay=config["RETRY_DELAY"],
+                    logger=self.logger,
+                    claim=lambda emails: ledger.claim(campaign_name, emails, lease.owner),
+                    release=lambda emails: ledger.release(campaign_name, emails),
+                    claim_batch=self.ledger_claim_batch(),
+                    breaker=breaker,
+                    retry_max_delay=config["RETRY_MAX_DELAY"],
+                    max_requeues=config["MAX_REQUEUES"],
+                    probe_idle=config["PROBE_IDLE_SECONDS"],
+                    conn_stats=conn_stats,
+                    defer=defer,
+                    keep=lambda server: accounts.usable(server.account.email),
+                    metrics=metrics,
+                )
+                job.pool = pool
+                if job.paused() or job.stopped():
+                    continue
+
+                try:
+                    for result in pool.run(scheduler.schedule(pending())):
+                        done.add(result.email)
+                        for attempt, category, error in result.errors:
+                            job.log(f"⚠ Attempt {attempt} failed for {result.email} [{category}]: {error}")
+                        if result.success:
+                            job.sent += 1
+                            job.activity.count(
+                                "sent",
+                                lambda n: f"✔ Sent: {result.email} (worker {result.worker_id})" if n == 1 else f"✔ Sent {n} emails (last {result.email})",
+                                window=COALESCE_SECONDS,
+                            )
+                        else:
+                            job.failed += 1
+                            job.log(f"✖ Failed: {result.email} [{result.category}]")
+                except QuotaExhausted:
+                    # Raised while opening the pool; hold_for_quota() has already paused the job.
+                    continue
+                # Only a drained schedule means every recipient has a result. A pool also
+                # ends when it is paused, and the job may have been resumed before it
+                # drained: start another pass.
+                if scheduler.drained and not job.stopped():
+                    finished = True
+                    break
+
+            if job.stopped():
+                status = "Stopped"
+            elif finished:
+                status = "Completed"
+                job.report_path = self.write_campaign_report(c_id, campaign_name, start_time, datetime.now(), job.total, job.sent, job.skipped, job.failed, job.accounts)
+                job.log("🎉 Campaign Completed!")
+                recipients.close()
+                os.remove(recipients.path)
+        except BaseException as e:
+            self.logger.error(f"Campaign Interrupted: {e}")
+            raise
+        finally:
+            try:
+                end_time = datetime.now()
+                if save_checkpoint:
+                    save_checkpoint(force=True)
+                self.update_campaign_status(c_id, campaign_name, start_time, end_time, job.total, job.sent, job.skipped, job.failed, status)
+                self.write_metrics_summary(job, status, start_time, end_time)
+                self.update_history(campaign_name)
+            finally:
+                lease.release()
+        return status
+
+    def write_metrics_summary(self, job, status, start_time, end_time):
+        # report_<id>.json next to report_<id>.csv: where the campaign's time went.
+        path = os.path.join(self.data_dir, f"report_{job.campaign_id}.json")
+        pool = job.pool
+        conn_stats = pool.conn_stats if pool else None
+        try:
+            write_summary(
+                path,
+                job.metrics,
+                campaign_name=job.campaign_name,
+                campaign_id=job.campaign_id,
+                status=status,
+                started=start_time.isoformat(),
+                finished=end_time.isoformat(),
+                duration_seconds=round((end_time - start_time).total_seconds(), 3),
+                total=job.total,
+                sent=job.sent,
+                skipped=job.skipped,
+                failed=job.failed,
+                accounts=job.accounts,
+                connections={
+                    "handshakes": conn_stats.handshakes,
+                    "avg_handshake_ms": round(conn_stats.avg_handshake_ms(), 3),
+                    "tls_resumed": conn_stats.tls_resumed,
+                    "probes": conn_stats.probes,
+                    "drops": conn_stats.drops,
+                } if conn_stats else {},
+            )
+            job.metrics_path = path
+        except OSError as e:
+            self.logger.warning(f"Could not write metrics summary {path}: {e}")
+        self.exporter.write()
@@ -0,0 +1,144 @@
+import random
+import smtplib
+import socket
+import threading
+import time
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+THROTTLED = "throttled"
+CONNECTION = "connection"
+AUTH = "auth"
+# 4xx for one recipient at RCPT time: the recipient's domain is deferring us, not the relay.
+DEFERRED = "deferred"
+
+RETRYABLE = (TRANSIENT, THROTTLED, CONNECTION, DEFERRED)
+# Categories that say something about the relay rather than about one recipient.
+RELAY_FAILURES = (THROTTLED, CONNECTION, AUTH)
+
+_THROTTLE_HINTS = ("rate limit", "too many", "quota", "try again later", "4.7.0", "4.7.28", "5.4.5", "temporarily deferred")
+
+
+# ================= CLASSIFIER =================
+def _reply(exc):
+    if isinstance(exc, smtplib.SMTPRecipientsRefused) and exc.recipients:
+        code, msg = next(iter(exc.recipients.values()))
+        return code, msg
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code, exc.smtp_error
+    return None, None
+
+
+def classify(exc):
+    # Returns (category, detail) for an exception raised while connecting or sending.
+    code, msg = _reply(exc)
+    if isinstance(msg, bytes):
+        msg = msg.decode("utf-8", "replace")
+    detail = f"{code} {msg}".strip() if code else str(exc) or exc.__class__.__name__
+
+    if isinstance(exc, smtplib.SMTPAuthenticationError) or code in (530, 534, 535):
+        return AUTH, detail
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, socket.timeout, ConnectionError)):
+        return CONNECTION, detail
+    if code is None:
+        return (CONNECTION, detail) if isinstance(exc, OSError) else (TRANSIENT, detail)
+    if code == 421:
+        return CONNECTION, detail
+    if isinstance(exc, smtplib.SMTPRecipientsRefused) and 400 <= code < 500:
+        return DEFERRED, detail
+    if any(hint in detail.lower() for hint in _THROTTLE_HINTS):
+        return THROTTLED, detail
+    if 400 <= code < 500:
+        return TRANSIENT, detail
+    return PERMANENT, detail
+
+
+def backoff_delay(attempt, base, cap):
+    # Full-jitter exponential backoff: uniform(0, min(cap, base * 2^(attempt-1))).
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+# ================= CIRCUIT BREAKER =================
+class CircuitBreaker:
+    # Opens after `threshold` consecutive relay-level failures and holds every worker
+    # for `cooldown` seconds; then lets one probe through (half-open). Each failed
+    # probe doubles the cooldown up to max_cooldown.
+    def __init__(self, threshold=5, cooldown=60, max_cooldown=900, on_trip=None):
+        self.on_trip = on_trip
+        self.threshold = max(1, threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        if self.state != "open":
+            return 0
+        return max(0, self.opened_at + self.cooldown - time.monotonic())
+
+    def poll(self):
+        # 0 if a send may go ahead now (as the probe, when half-open), else seconds to wait.
+        with self.lock:
+            if self.state == "closed":
+                return 0
+            if self.state == "open" and self.remaining() == 0:
+                self.state = "half-open"
+            if self.state == "half-open" and not self.probing:
+                self.probing = True
+                return 0
+            return self.remaining() or 0.5
+
+    def wait(self, stop_event):
+        # Blocks while open; returns False if stop_event was set while waiting.
+        while True:
+            wait = self.poll()
+            if not wait:
+                return True
+            if stop_event.wait(wait):
+                return False
+
+    def release_probe(self):
+        # Called when a pool (re)starts: a probe abandoned by a stopped pool must not block the next one.
+        with self.lock:
+            self.probing = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.probing = False
+            if self.state != "closed":
+                self.state = "closed"
+                self.cooldown = self.base_cooldown
+
+    def record_failure(self, category):
+        tripped = False
+        with self.lock:
+            if category not in RELAY_FAILURES:
+                # A recipient-level answer still proves the relay is reachable.
+                if self.state == "half-open":
+                    self.state = "closed"
+                    self.cooldown = self.base_cooldown
+                self.probing = False
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == "half-open":
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open()
+                tripped = True
+            elif self.state == "closed" and (self.failures >= self.threshold or category == AUTH):
+                self._open()
+                tripped = True
+        if tripped and self.on_trip:
+            self.on_trip(category)
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self.probing = False
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+
+import pandas as pd
+
+from navyanta.ledger import TABLES
+
+# Precomputed tables the dashboard reads, one Parquet file each, covering every campaign.
+AGGREGATES = {
+    "runs": ["campaign_id", "campaign_name", "start_time", "end_time", "total", "sent", "skipped", "failed", "duration", "status"],
+    "sends_by_hour": ["campaign_name", "hour", "sent", "failed"],
+    "failure_reasons": ["campaign_name", "category", "reason", "count"],
+    "domains": ["campaign_name", "domain", "sent", "failed"],
+}
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def campaign_slug(campaign_name):
+    # File-system safe and unique per name.
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", campaign_name).strip("_")[:40] or "campaign"
+    return f"{slug}-{hashlib.sha1(campaign_name.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _columns(kind):
+    return [c.strip() for c in TABLES[kind][1].split(",")]
+
+
+def _counts(parts, key):
+    # Sums per-batch counts into one frame of key, sent, failed.
+    totals = {}
+    for kind in ("sent", "failed"):
+        series = [s for s in parts[kind] if len(s)]
+        totals[kind] = pd.concat(series).groupby(level=0).sum() if series else pd.Series(dtype="int64")
+    frame = pd.concat(totals, axis=1).fillna(0).astype("int64")
+    frame.index.name = key
+    return frame.reset_index()
+
+
+# ================= HISTORY STORE =================
+class HistoryStore:
+    # Columnar copy of the ledger for reporting, under `directory`:
+    #   campaigns/<slug>/sent.parquet, failed.parquet  one campaign's raw rows
+    #   runs / sends_by_hour / failure_reasons / domains.parquet  aggregates
+    # update() rebuilds one campaign's files and its rows of each aggregate from the
+    # ledger, reading in batches, and runs when a campaign run ends. The dashboard only
+    # reads the aggregates. Needs pyarrow; `available` is False without it.
+    def __init__(self, directory, ledger, batch_size=50000):
+        self.directory = directory
+        self.ledger = ledger
+        self.batch_size = batch_size
+        self.available = parquet_available()
+        self.lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.parquet")
+
+    def campaign_dir(self, campaign_name):
+        return os.path.join(self.directory, "campaigns", campaign_slug(campaign_name))
+
+    def mtime(self, name):
+        path = self._path(name)
+        return os.path.getmtime(path) if os.path.exists(path) else 0
+
+    def load(self, name):
+        path = self._path(name)
+        if not self.available or not os.path.exists(path):
+            return pd.DataFrame(columns=AGGREGATES[name])
+        return pd.read_parquet(path)
+
+    def _write(self, frame, path):
+        tmp = f"{path}.tmp"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    def _replace(self, name, campaign_name, frame):
+        current = self.load(name)
+        current = current[current["campaign_name"] != campaign_name]
+        if len(frame) and len(current):
+            current = pd.concat([current, frame[AGGREGATES[name]]], ignore_index=True)
+        elif len(frame):
+            current = frame[AGGREGATES[name]]
+        self._write(current, self._path(name))
+
+    def _export_rows(self, kind, campaign_name, path, hours, domains, reasons):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = _columns(kind)
+        schema = pa.schema([(c, pa.string()) for c in columns])
+        time_column = "sent_time" if kind == "sent" else "time"
+        tmp = f"{path}.tmp"
+        with pq.ParquetWriter(tmp, schema) as writer:
+            for rows in self.ledger.iter_rows(kind, campaign_name, self.batch_size):
+                df = pd.DataFrame.from_records(rows, columns=columns)
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+                # Timestamps are ISO strings: the first 13 characters are the hour.
+                hour = pd.to_datetime(df[time_column].str.slice(0, 13), format="%Y-%m-%dT%H", errors="coerce")
+                hours[kind].append(df.groupby(hour).size())
+                domains[kind].append(df.groupby(df["email"].str.rpartition("@")[2].str.lower()).size())
+                if kind == "failed":
+                    reasons.append(df.groupby([df["category"].fillna(""), df["reason"].fillna("")]).size())
+        os.replace(tmp, path)
+
+    def update(self, campaign_name):
+        if not self.available:
+            raise RuntimeError("The history store requires pyarrow (pip install pyarrow).")
+        target = self.campaign_dir(campaign_name)
+        os.makedirs(target, exist_ok=True)
+        hours = {"sent": [], "failed": []}
+        domains = {"sent": [], "failed": []}
+        reasons = []
+        for kind in ("sent", "failed"):
+            self._export_rows(kind, campaign_name, os.path.join(target, f"{kind}.parquet"), hours, domains, reasons)
+
+        runs = pd.DataFrame.from_records(
+            [row for rows in self.ledger.iter_rows("history", campaign_name) for row in rows], columns=_columns("history")
+        )
+        by_hour = _counts(hours, "hour")
+        by_domain = _counts(domains, "domain")
+        reasons = [s for s in reasons if len(s)]
+        if reasons:
+            by_reason = pd.concat(reasons).groupby(level=[0, 1]).sum().rename("count")
+            by_reason.index.names = ["category", "reason"]
+            by_reason = by_reason.reset_index()
+        else:
+            by_reason = pd.DataFrame(columns=["category", "reason", "count"])
+        for frame in (by_hour, by_domain, by_reason):
+            frame["campaign_name"] = campaign_name
+
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._replace("runs", campaign_name, runs)
+            self._replace("sends_by_hour", campaign_name, by_hour)
+            self._replace("failure_reasons", campaign_name, by_reason)
+            self._replace("domains", campaign_name, by_domain)
+
+    def remove(self, campaign_name):
+        if not self.available:
+            return
+        with self.lock:
+            for name in AGGREGATES:
+                if os.path.exists(self._path(name)):
+                    self._replace(name, campaign_name, pd.DataFrame(columns=AGGREGATES[name]))
+        shutil.rmtree(self.campaign_dir(campaign_name), ignore_errors=True)
+
+    def rebuild(self):
+        # Every campaign in the ledger, e.g. after upgrading or restoring a backup.
+        names = self.ledger.campaign_names()
+        with self.lock:
+            for name in AGGREGATES:
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+        for name in names:
+            self.update(name)
+        return len(names)
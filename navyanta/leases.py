@@ -0,0 +1,200 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from navyanta.sender import TokenBucket
+
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaign_leases (
+    campaign_name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    acquired REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def _connect(path, timeout=10):
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(LEASE_SCHEMA)
+    return conn
+
+
+# ================= CAMPAIGN LEASES =================
+class CampaignLocks:
+    # One lease per campaign name, in SQLite so every process on the data directory
+    # (the app and any CLI runs) sees it. A running campaign renews its lease every
+    # ttl / 3 seconds; if the process crashes or hangs the lease simply expires and
+    # the next acquire() takes it over. A holder on this host whose process has exited
+    # is taken over at once. Times are wall-clock so processes agree on them.
+
+    # Owners of this process's unreleased leases, shared by every instance.
+    active = set()
+
+    def __init__(self, path, ttl=30):
+        self.ttl = ttl
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.lock = threading.Lock()
+        self.conn = _connect(path)
+
+    def holder(self, campaign_name):
+        # (owner, seconds left) of a live lease, or None.
+        with self.lock:
+            row = self.conn.execute("SELECT owner, expires FROM campaign_leases WHERE campaign_name = ?", (campaign_name,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0], row[1] - time.time()
+
+    def acquire(self, campaign_name, on_lost=None):
+        # A started Lease, or None if another holder's lease is still live.
+        owner = f"{self.owner_prefix}:{uuid.uuid4().hex[:8]}"
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self.conn.execute("SELECT owner, expires FROM campaign_leases WHERE campaign_name = ?", (campaign_name,)).fetchone()
+                # A live lease blocks, unless its run was on this host and has gone
+                # (a crashed app or CLI run): no need to wait out its ttl.
+                if row is not None and row[1] > now and (self.alive(row[0]) or not self._on_this_host(row[0])):
+                    self.conn.execute("ROLLBACK")
+                    return None
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO campaign_leases (campaign_name, owner, acquired, expires) VALUES (?, ?, ?, ?)",
+                    (campaign_name, owner, now, now + self.ttl),
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self.active.add(owner)
+        lease = Lease(self, campaign_name, owner, on_lost)
+        lease.reclaimed_from = row[0] if row is not None else None
+        lease.thread.start()
+        return lease
+
+    def alive(self, owner):
+        # Whether the run that held `owner` may still be sending. An expired lease only
+        # means it stopped renewing: a run in this process counts until it releases,
+        # and one in another process on this host while that process exists. Runs on
+        # other hosts can only be judged by their lease.
+        host, _, rest = (owner or "").partition(":")
+        pid = rest.partition(":")[0]
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        if int(pid) == os.getpid():
+            return owner in self.active
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+        return True
+
+    def _on_this_host(self, owner):
+        return (owner or "").partition(":")[0] == socket.gethostname()
+
+    def _renew(self, lease):
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE campaign_leases SET expires = ? WHERE campaign_name = ? AND owner = ?",
+                (time.time() + self.ttl, lease.campaign_name, lease.owner),
+            )
+        return cursor.rowcount == 1
+
+    def _release(self, lease):
+        with self.lock:
+            self.active.discard(lease.owner)
+            if lease.lost:
+                return
+            self.conn.execute("DELETE FROM campaign_leases WHERE campaign_name = ? AND owner = ?", (lease.campaign_name, lease.owner))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class Lease:
+    # Held by one run of a campaign. If a renewal finds the lease gone (it expired and
+    # someone else took it), `lost` is set and on_lost() is called so the run can stop.
+    def __init__(self, locks, campaign_name, owner, on_lost=None):
+        self.locks = locks
+        self.campaign_name = campaign_name
+        self.owner = owner
+        self.on_lost = on_lost
+        self.lost = False
+        self.reclaimed_from = None
+        self.released = threading.Event()
+        self.thread = threading.Thread(target=self._heartbeat, daemon=True)
+
+    def _heartbeat(self):
+        while not self.released.wait(self.locks.ttl / 3):
+            try:
+                renewed = self.locks._renew(self)
+            except sqlite3.Error:
+                # Busy or briefly unavailable: try again next beat, well before expiry.
+                continue
+            if not renewed:
+                self.lost = True
+                if self.on_lost:
+                    self.on_lost()
+                return
+
+    def release(self):
+        self.released.set()
+        self.thread.join()
+        self.locks._release(self)
+
+
+# ================= SHARED RATE BUDGET =================
+class SharedTokenBucket(TokenBucket):
+    # TokenBucket whose tokens live in the same database as the leases, so every
+    # process on the data directory (the app and any CLI runs) draws on one
+    # RATE_PER_MINUTE budget. Each poll() is one small write transaction; the row is
+    # not fsynced, since losing a few tokens' state in a crash does no harm.
+    def __init__(self, path, rate_per_minute, burst=1, name="send"):
+        super().__init__(rate_per_minute, burst)
+        self.name = name
+        # A short busy timeout: a poll that cannot get the write lock soon just retries.
+        self.conn = _connect(path, timeout=0.5)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def poll(self):
+        if not self.rate:
+            return 0
+        with self.lock:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError:
+                # Another process holds the write lock longer than the busy timeout.
+                return 0.05
+            try:
+                now = time.time()
+                row = self.conn.execute("SELECT tokens, updated FROM rate_buckets WHERE name = ?", (self.name,)).fetchone()
+                tokens = self.capacity if row is None else min(self.capacity, row[0] + max(0, now - row[1]) * self.rate)
+                wait = 0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                self.conn.execute("INSERT OR REPLACE INTO rate_buckets (name, tokens, updated) VALUES (?, ?, ?)", (self.name, tokens, now))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
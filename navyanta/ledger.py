@@ -0,0 +1,423 @@
+import csv
+import heapq
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+SENT_HEADERS = ["Campaign ID", "Campaign Name", "Email", "Sent Time"]
+FAILED_HEADERS = ["Campaign ID", "Campaign Name", "Email", "Reason", "Time", "Category"]
+HISTORY_HEADERS = ["Campaign ID", "Campaign Name", "Start Time", "End Time", "Total", "Sent", "Skipped", "Failed", "Duration", "Status"]
+
+# Rows are clustered by campaign name, so a campaign's lookups and its delete are
+# range operations on the primary key and never touch other campaigns' rows.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS inflight (
+    campaign_name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    claimed_time TEXT NOT NULL,
+    owner TEXT,
+    PRIMARY KEY (campaign_name, email)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sent_emails (
+    campaign_name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    campaign_id TEXT NOT NULL,
+    sent_time TEXT NOT NULL,
+    PRIMARY KEY (campaign_name, email)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS failed_emails (
+    campaign_name TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    campaign_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    reason TEXT,
+    time TEXT NOT NULL,
+    category TEXT,
+    PRIMARY KEY (campaign_name, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS campaign_history (
+    campaign_name TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    campaign_id TEXT NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    total INTEGER,
+    sent INTEGER,
+    skipped INTEGER,
+    failed INTEGER,
+    duration REAL,
+    status TEXT,
+    PRIMARY KEY (campaign_name, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checkpoints (
+    campaign_name TEXT PRIMARY KEY,
+    list_fingerprint TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    updated_time TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+TABLES = {
+    "sent": ("sent_emails", "campaign_id, campaign_name, email, sent_time", SENT_HEADERS),
+    "failed": ("failed_emails", "campaign_id, campaign_name, email, reason, time, category", FAILED_HEADERS),
+    "history": ("campaign_history", "campaign_id, campaign_name, start_time, end_time, total, sent, skipped, failed, duration, status", HISTORY_HEADERS),
+}
+
+
+IN_DOUBT_REASON = "Unconfirmed at crash; not resent"
+
+
+class LedgerStore:
+    # durability="strict" commits (and fsyncs) every row, as the CSV ledgers did.
+    # durability="group" keeps one transaction open and commits it every
+    # flush_interval seconds or flush_rows rows. Recipients are claimed durably in
+    # batches before they are sent, so a crash can only leave claimed-but-unrecorded
+    # rows, which resolve_in_doubt() reports instead of resending.
+    def __init__(self, path, durability="strict", flush_interval=0.2, flush_rows=100):
+        self.path = path
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.flush_rows = max(1, flush_rows)
+        self.lock = threading.Lock()
+        self.in_txn = False
+        self.pending_rows = 0
+        self.closed = threading.Event()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+        self._upgrade()
+        if durability == "group":
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def _upgrade(self):
+        columns = {r[1] for r in self.conn.execute("PRAGMA table_info(failed_emails)")}
+        if "category" not in columns:
+            self.conn.execute("ALTER TABLE failed_emails ADD COLUMN category TEXT")
+        columns = {r[1] for r in self.conn.execute("PRAGMA table_info(inflight)")}
+        if "owner" not in columns:
+            self.conn.execute("ALTER TABLE inflight ADD COLUMN owner TEXT")
+
+    def close(self):
+        self.closed.set()
+        with self.lock:
+            self._commit()
+            self.conn.close()
+
+    def _flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def _commit(self):
+        if self.in_txn:
+            self.conn.execute("COMMIT")
+            self.in_txn = False
+            self.pending_rows = 0
+
+    def flush(self):
+        with self.lock:
+            if not self.closed.is_set():
+                self._commit()
+
+    @contextmanager
+    def _writing(self, rows=1):
+        with self.lock:
+            if self.durability != "group":
+                # strict: each call is one transaction, committed (and fsynced) on exit.
+                self.conn.execute("BEGIN")
+                try:
+                    yield self.conn
+                except BaseException:
+                    self.conn.execute("ROLLBACK")
+                    raise
+                self.conn.execute("COMMIT")
+                return
+            if not self.in_txn:
+                self.conn.execute("BEGIN")
+                self.in_txn = True
+            yield self.conn
+            self.pending_rows += rows
+            if self.pending_rows >= self.flush_rows:
+                self._commit()
+
+    def _next_seq(self, table, campaign_name):
+        row = self.conn.execute(f"SELECT COALESCE(MAX(seq), 0) + 1 FROM {table} WHERE campaign_name = ?", (campaign_name,)).fetchone()
+        return row[0]
+
+    def claim(self, campaign_name, emails, owner=None):
+        # Journals a batch before it is sent, in both modes: a crash before a result is
+        # recorded leaves the claim, and resolve_in_doubt() reports it instead of resending.
+        # `owner` is the claiming run's lease owner.
+        now = datetime.now().isoformat()
+        with self._writing(len(emails)) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO inflight (campaign_name, email, claimed_time, owner) VALUES (?, ?, ?, ?)",
+                [(campaign_name, email, now, owner) for email in emails],
+            )
+            self._commit()
+
+    def release(self, campaign_name, emails):
+        with self._writing(len(emails)) as conn:
+            conn.executemany("DELETE FROM inflight WHERE campaign_name = ? AND email = ?", [(campaign_name, email) for email in emails])
+
+    def resolve_in_doubt(self, campaign_id, campaign_name, alive=None):
+        # Claims whose owner is still running (alive(owner) is true, e.g. a hung run whose
+        # lease was taken over) are left for that run to record; see inflight_emails().
+        with self._writing() as conn:
+            rows = conn.execute("SELECT email, owner FROM inflight WHERE campaign_name = ?", (campaign_name,)).fetchall()
+            emails = [email for email, owner in rows if alive is None or not alive(owner)]
+            now = datetime.now().isoformat()
+            for email in emails:
+                conn.execute(
+                    "INSERT INTO failed_emails (campaign_name, seq, campaign_id, email, reason, time, category) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (campaign_name, self._next_seq("failed_emails", campaign_name), campaign_id, email, IN_DOUBT_REASON, now, "in_doubt"),
+                )
+                conn.execute("DELETE FROM inflight WHERE campaign_name = ? AND email = ?", (campaign_name, email))
+            self._commit()
+        return emails
+
+    def inflight_emails(self, campaign_name):
+        with self.lock:
+            rows = self.conn.execute("SELECT email FROM inflight WHERE campaign_name = ?", (campaign_name,)).fetchall()
+        return {r[0] for r in rows}
+
+    def log_sent(self, campaign_id, campaign_name, email, sent_time):
+        with self._writing() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO sent_emails (campaign_name, email, campaign_id, sent_time) VALUES (?, ?, ?, ?)",
+                (campaign_name, email, campaign_id, sent_time),
+            )
+            conn.execute("DELETE FROM inflight WHERE campaign_name = ? AND email = ?", (campaign_name, email))
+
+    def log_failed(self, campaign_id, campaign_name, email, reason, time, category=None):
+        with self._writing() as conn:
+            conn.execute(
+                "INSERT INTO failed_emails (campaign_name, seq, campaign_id, email, reason, time, category) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (campaign_name, self._next_seq("failed_emails", campaign_name), campaign_id, email, reason, time, category),
+            )
+            conn.execute("DELETE FROM inflight WHERE campaign_name = ? AND email = ?", (campaign_name, email))
+
+    def log_campaign(self, campaign_id, campaign_name, start_time, end_time, total, sent, skipped, failed, duration, status):
+        with self._writing() as conn:
+            conn.execute(
+                "INSERT INTO campaign_history (campaign_name, seq, campaign_id, start_time, end_time, total, sent, skipped, failed, duration, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (campaign_name, self._next_seq("campaign_history", campaign_name), campaign_id, start_time, end_time, total, sent, skipped, failed, duration, status),
+            )
+            self._commit()
+
+    def checkpoint(self, campaign_name, fingerprint):
+        # Position in the recipient list up to which every row has a result, if the
+        # checkpoint was taken on the same cleaned list; otherwise 0.
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT position FROM checkpoints WHERE campaign_name = ? AND list_fingerprint = ?", (campaign_name, fingerprint)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def save_checkpoint(self, campaign_name, fingerprint, position):
+        # Goes through the same transaction as the results it covers (group mode), so
+        # the position is never durable ahead of them.
+        with self._writing() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (campaign_name, list_fingerprint, position, updated_time) VALUES (?, ?, ?, ?)",
+                (campaign_name, fingerprint, position, datetime.now().isoformat()),
+            )
+
+    def sent_among(self, campaign_name, emails):
+        sent = set()
+        emails = list(emails)
+        with self.lock:
+            for i in range(0, len(emails), 500):
+                batch = emails[i:i + 500]
+                sent.update(r[0] for r in self.conn.execute(
+                    f"SELECT email FROM sent_emails WHERE campaign_name = ? AND email IN ({','.join('?' * len(batch))})",
+                    [campaign_name, *batch],
+                ))
+        return sent
+
+    def in_doubt_emails(self, campaign_name):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT email FROM failed_emails WHERE campaign_name = ? AND category = 'in_doubt'", (campaign_name,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def retryable_failures(self, campaign_name):
+        # Failed in an earlier run, never sent since, and not possibly delivered at a crash.
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT f.email FROM failed_emails f WHERE f.campaign_name = ? "
+                "AND NOT EXISTS (SELECT 1 FROM sent_emails s WHERE s.campaign_name = f.campaign_name AND s.email = f.email) "
+                "AND NOT EXISTS (SELECT 1 FROM failed_emails d WHERE d.campaign_name = f.campaign_name AND d.email = f.email AND d.category = 'in_doubt')",
+                (campaign_name,),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def sent_emails(self, campaign_name):
+        with self.lock:
+            rows = self.conn.execute("SELECT email FROM sent_emails WHERE campaign_name = ?", (campaign_name,)).fetchall()
+        return {r[0] for r in rows}
+
+    def is_sent(self, campaign_name, email):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM sent_emails WHERE campaign_name = ? AND email = ?", (campaign_name, email)).fetchone()
+        return row is not None
+
+    def has_sent(self, campaign_name):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM sent_emails WHERE campaign_name = ? LIMIT 1", (campaign_name,)).fetchone()
+        return row is not None
+
+    def campaign_names(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT campaign_name FROM campaign_history UNION SELECT campaign_name FROM sent_emails "
+                "UNION SELECT campaign_name FROM failed_emails"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def campaign_id(self, campaign_name):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT campaign_id FROM campaign_history WHERE campaign_name = ? ORDER BY seq LIMIT 1", (campaign_name,)
+            ).fetchone()
+            if row is None:
+                row = self.conn.execute("SELECT campaign_id FROM sent_emails WHERE campaign_name = ? LIMIT 1", (campaign_name,)).fetchone()
+        return row[0] if row else None
+
+    def delete_campaign(self, campaign_name):
+        with self.lock:
+            self._commit()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("sent_emails", "failed_emails", "campaign_history", "inflight", "checkpoints"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE campaign_name = ?", (campaign_name,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def iter_rows(self, kind, campaign_name=None, batch_size=5000):
+        # Batches of TABLES[kind] rows for one campaign (or all), read through a
+        # connection of its own: WAL gives it a consistent snapshot and sends are never
+        # blocked on self.lock while a large export or history update runs.
+        table, columns, _ = TABLES[kind]
+        self.flush()
+        conn = sqlite3.connect(self.path)
+        try:
+            if campaign_name is None:
+                cursor = conn.execute(f"SELECT {columns} FROM {table}")
+            else:
+                cursor = conn.execute(f"SELECT {columns} FROM {table} WHERE campaign_name = ?", (campaign_name,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+
+    def export_csv(self, kind, path, campaign_name=None):
+        # Streams the rows to `path` (written to a temp file, then renamed); returns the row count.
+        _, _, headers = TABLES[kind]
+        count = 0
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for rows in self.iter_rows(kind, campaign_name):
+                writer.writerows(rows)
+                count += len(rows)
+        os.replace(tmp, path)
+        return count
+
+    # ================= CSV MIGRATION =================
+    def migrate_csv(self, sent_file, failed_file, history_file):
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'csv_migrated'").fetchone():
+                return False
+            self._commit()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO sent_emails (campaign_id, campaign_name, email, sent_time) VALUES (?, ?, ?, ?)",
+                    _read_rows(sent_file, 4),
+                )
+                self.conn.executemany(
+                    "INSERT INTO failed_emails (campaign_id, campaign_name, email, reason, time, seq) VALUES (?, ?, ?, ?, ?, ?)",
+                    _numbered(_read_rows(failed_file, 5)),
+                )
+                self.conn.executemany(
+                    "INSERT INTO campaign_history (campaign_id, campaign_name, start_time, end_time, total, sent, skipped, failed, duration, status, seq) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    _numbered(_read_rows(history_file, 10)),
+                )
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('csv_migrated', datetime('now'))")
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        for fp in (sent_file, failed_file, history_file):
+            if os.path.exists(fp):
+                os.replace(fp, fp + ".migrated")
+        return True
+
+
+# ================= RESUME CURSOR =================
+class ResumeCursor:
+    # Low-water mark over recipient list positions: every position at or below mark()
+    # was skipped or has a recorded result, so a resume can seek straight past it.
+    # Positions are issued in list order by the feeder and resolved in any order.
+    def __init__(self, position=0):
+        self.issued = position
+        self.open = set()
+        self.heap = []
+        self.lock = threading.Lock()
+
+    def issue(self, seq, pending=True):
+        with self.lock:
+            self.issued = max(self.issued, seq)
+            if pending:
+                self.open.add(seq)
+                heapq.heappush(self.heap, seq)
+
+    def resolve(self, seq):
+        with self.lock:
+            self.open.discard(seq)
+
+    def mark(self):
+        with self.lock:
+            while self.heap and self.heap[0] not in self.open:
+                heapq.heappop(self.heap)
+            return self.heap[0] - 1 if self.heap else self.issued
+
+    def rewind(self):
+        # Before another pass over the list: positions still open were released unsent.
+        position = self.mark()
+        with self.lock:
+            self.open.clear()
+            self.heap.clear()
+            self.issued = position
+        return position
+
+
+def _read_rows(filepath, width):
+    if not os.path.exists(filepath):
+        return
+    with open(filepath, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) >= width:
+                yield row[:width]
+
+
+def _numbered(rows):
+    seqs = {}
+    for row in rows:
+        seqs[row[1]] = seqs.get(row[1], 0) + 1
+        yield row + [seqs[row[1]]]
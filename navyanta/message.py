@@ -0,0 +1,89 @@
+import base64
+import copy
+from email import policy
+from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
+from email.mime.text import MIMEText
+
+from navyanta.creative import Creative
+from navyanta.personalize import CompiledTemplate
+
+SMTP_POLICY = policy.compat32.clone(linesep="\r\n")
+_TO_PLACEHOLDER = "recipient@placeholder.invalid"
+_BODY_PLACEHOLDER = "NAVYANTA-PERSONALIZED-HTML-BODY"
+
+
+class MessageTemplate:
+    # The MIME tree (HTML part, base64 creative, boundaries) is serialized once per
+    # campaign; each recipient only costs splicing their To header into the bytes.
+    # If the HTML has {{ merge fields }}, it is compiled (see personalize.py) and the
+    # HTML part's body is left as a slot too: render() fills it with the recipient's
+    # HTML, base64-encoded, while headers, boundaries and the creative stay shared.
+    # creative is a Creative (see creative.py), whose base64 is reused, or raw image bytes.
+    def __init__(self, sender, subject, html, creative=None, image_filename="Navyanta Recruitment Flyer.png"):
+        body = CompiledTemplate(html)
+        self.body = body if body.slots else None
+        msg = MIMEMultipart("related")
+        msg["From"] = sender
+        msg["To"] = _TO_PLACEHOLDER
+        msg["Subject"] = subject.strip()
+
+        alt = MIMEMultipart("alternative")
+        msg.attach(alt)
+        if self.body:
+            part = MIMENonMultipart("text", "html", charset="utf-8")
+            part["Content-Transfer-Encoding"] = "base64"
+            part.set_payload(_BODY_PLACEHOLDER)
+            alt.attach(part)
+        else:
+            alt.attach(MIMEText(html, "html"))
+
+        if creative:
+            if not isinstance(creative, Creative):
+                creative = Creative(None, creative)
+            attachment = creative.mime_part()
+            attachment.add_header("Content-ID", "<creative>")
+            attachment.add_header("Content-Disposition", "inline", filename=image_filename)
+            msg.attach(attachment)
+
+        raw = msg.as_bytes(policy=SMTP_POLICY)
+        to_line = b"To: " + _TO_PLACEHOLDER.encode() + b"\r\n"
+        idx = raw.index(to_line)
+        self.sender = sender
+        self.prefix = raw[:idx] + b"To: "
+        self.suffix = b"\r\n" + raw[idx + len(to_line):]
+        self.middle = None
+        if self.body:
+            self.middle, _, self.suffix = self.suffix.partition(_BODY_PLACEHOLDER.encode())
+        self.size = len(self.prefix) + len(self.suffix)
+
+    @property
+    def fields(self):
+        return self.body.fields if self.body else set()
+
+    def bind_batch(self, rows):
+        # Merge values for a batch of recipient rows (dicts of column -> value), in order.
+        if not self.body:
+            return [None] * len(rows)
+        return self.body.bind_batch(rows)
+
+    def preview_values(self):
+        return self.body.preview_values() if self.body else None
+
+    def for_sender(self, sender):
+        # Same message from another sender account: only the From header changes.
+        if sender == self.sender:
+            return self
+        variant = copy.copy(self)
+        variant.sender = sender
+        variant.prefix = self.prefix.replace(f"From: {self.sender}\r\n".encode(), f"From: {sender}\r\n".encode(), 1)
+        variant.size = len(variant.prefix) + len(variant.suffix)
+        return variant
+
+    def render(self, to_email, values=None):
+        # values come from bind_batch(); without them merge fields get their fallbacks.
+        if not self.body:
+            return b"".join((self.prefix, to_email.encode("utf-8"), self.suffix))
+        html = self.body.render(values if values is not None else self.body.bind({}))
+        encoded = base64.encodebytes(html).replace(b"\n", b"\r\n")[:-2]
+        return b"".join((self.prefix, to_email.encode("utf-8"), self.middle, encoded, self.suffix))
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; from a ~10 µs render up to a minute-long retry sleep.
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+# ================= HISTOGRAMS & COUNTERS =================
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+            if n and seen + n >= rank:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_seconds": round(self.sum, 6),
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    # Stage timers and labelled counters for one campaign. Stages in use: render,
+    # smtp_send, handshake, probe, rate_wait, breaker_wait, retry_sleep, ledger_write.
+    def __init__(self, **labels):
+        self.labels = labels
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def counter(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def summary(self):
+        with self.lock:
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                key = name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+                counters[key] = value
+            return {
+                "stages": {stage: hist.summary() for stage, hist in sorted(self.stages.items())},
+                "counters": counters,
+            }
+
+
+# ================= EXPORT =================
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def prometheus_text(registries):
+    histograms = []
+    counters = {}
+    for metrics in registries:
+        base = sorted(metrics.labels.items())
+        with metrics.lock:
+            for stage, hist in sorted(metrics.stages.items()):
+                labels = base + [("stage", stage)]
+                cumulative = 0
+                for bound, n in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                    cumulative += n
+                    histograms.append(f"navyanta_stage_seconds_bucket{_labels(labels + [('le', bound)])} {cumulative}")
+                histograms.append(f"navyanta_stage_seconds_sum{_labels(labels)} {hist.sum:.6f}")
+                histograms.append(f"navyanta_stage_seconds_count{_labels(labels)} {hist.count}")
+            for (name, pairs), value in sorted(metrics.counters.items()):
+                counters.setdefault(name, []).append(f"navyanta_{name}_total{_labels(base + list(pairs))} {value}")
+
+    lines = []
+    if histograms:
+        lines.append("# TYPE navyanta_stage_seconds histogram")
+        lines.extend(histograms)
+    for name, samples in sorted(counters.items()):
+        lines.append(f"# TYPE navyanta_{name}_total counter")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, registries):
+    # Atomic replace, as the node_exporter textfile collector expects.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(registries))
+    os.replace(tmp, path)
+
+
+def write_summary(path, metrics, **extra):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**extra, **metrics.summary()}, f, indent=2)
+
+
+class MetricsExporter:
+    # Rewrites the textfile every `interval` seconds and, if port is set, serves the
+    # same text at http://127.0.0.1:<port>/metrics. registries() returns the Metrics to export.
+    def __init__(self, registries, textfile=None, port=0, interval=15, logger=None):
+        self.registries = registries
+        self.textfile = textfile
+        self.interval = interval
+        self.logger = logger
+        self.server = None
+        if port:
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip("/") != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = prometheus_text(exporter.registries()).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            try:
+                self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+                self.server.daemon_threads = True
+                threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            except OSError as e:
+                # Another process (the UI or a CLI run) already serves this port.
+                if logger:
+                    logger.warning(f"Metrics endpoint not started on port {port}: {e}")
+        if textfile:
+            threading.Thread(target=self._write_loop, daemon=True).start()
+
+    def write(self):
+        if self.textfile:
+            try:
+                write_textfile(self.textfile, self.registries())
+            except OSError as e:
+                if self.logger:
+                    self.logger.warning(f"Could not write metrics to {self.textfile}: {e}")
+
+    def _write_loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.write()
@@ -0,0 +1,71 @@
+import html
+import re
+
+# {{ column }} or {{ column | fallback }}; column names match the sheet's headers,
+# which ingestion lower-cases.
+FIELD = re.compile(r"\{\{\s*([^{}|]+?)\s*(?:\|\s*([^{}]*?)\s*)?\}\}")
+
+
+def merge_fields(text):
+    return {m.group(1).lower() for m in FIELD.finditer(text or "")}
+
+
+def _text(value):
+    if value is None or value != value:  # None or NaN
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Phone numbers and IDs come back from Excel as floats.
+        return str(int(value))
+    return str(value).strip()
+
+
+# ================= COMPILED TEMPLATES =================
+class CompiledTemplate:
+    # HTML split once into static byte segments and the slots between them. Slot values
+    # from the recipient's row are HTML-escaped; the surrounding HTML is the campaign's
+    # own and is kept as written.
+    def __init__(self, source):
+        self.segments = []
+        self.slots = []
+        pos = 0
+        for m in FIELD.finditer(source):
+            self.segments.append(source[pos:m.start()].encode("utf-8"))
+            self.slots.append((m.group(1).lower(), m.group(2) or ""))
+            pos = m.end()
+        self.segments.append(source[pos:].encode("utf-8"))
+        self.fields = {field for field, _ in self.slots}
+
+    def bind_batch(self, rows):
+        # Escaped slot values for many recipients at once, column by column; repeated
+        # values (first names, cities) are escaped once per batch.
+        columns = []
+        for field, fallback in self.slots:
+            escaped = {}
+            column = []
+            for row in rows:
+                value = _text(row.get(field)) or fallback
+                cached = escaped.get(value)
+                if cached is None:
+                    cached = escaped[value] = html.escape(value).encode("utf-8")
+                column.append(cached)
+            columns.append(column)
+        return list(zip(*columns)) if columns else [()] * len(rows)
+
+    def bind(self, row):
+        return self.bind_batch([row])[0]
+
+    def preview_values(self):
+        # For previews and test emails: the fallback, or the field name in brackets.
+        return tuple(html.escape(fallback or f"[{field}]").encode("utf-8") for field, fallback in self.slots)
+
+    def render(self, values):
+        parts = [self.segments[0]]
+        for value, segment in zip(values, self.segments[1:]):
+            parts.append(value)
+            parts.append(segment)
+        return b"".join(parts)
+
+
+def preview(source):
+    template = CompiledTemplate(source)
+    return template.render(template.preview_values()).decode("utf-8")
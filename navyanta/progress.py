@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import deque
+
+# Same-kind events closer together than this share one line: at most 4 lines a
+# second per kind, however fast the campaign sends.
+COALESCE_SECONDS = 0.25
+
+
+# ================= ACTIVITY LOG =================
+class ActivityLog:
+    # Bounded log written by the campaign thread and read by the UI fragment / CLI.
+    # seq grows on every change so a reader can tell whether anything is new.
+    def __init__(self, maxlen=200):
+        self.lines = deque(maxlen=maxlen)
+        self.seq = 0
+        self.run = None # (key, started, count) of the last line if it is a counted one
+        self.lock = threading.Lock()
+
+    def log(self, msg):
+        with self.lock:
+            self.lines.append(msg)
+            self.run = None
+            self.seq += 1
+
+    def count(self, key, render, n=1, window=None):
+        # Adds n events of kind `key`. If the last line is the same kind (and, with a
+        # window, was started less than `window` seconds ago) it is rewritten as
+        # render(total) instead of adding a line.
+        now = time.monotonic()
+        with self.lock:
+            run = self.run
+            if run and run[0] == key and self.lines and (window is None or now - run[1] < window):
+                total = run[2] + n
+                self.lines[-1] = render(total)
+                self.run = (key, run[1], total)
+            else:
+                self.lines.append(render(n))
+                self.run = (key, now, n)
+            self.seq += 1
+
+    def tail(self, n=15):
+        with self.lock:
+            return list(self.lines)[-n:]
+
+    def __iter__(self):
+        return iter(self.tail(len(self.lines)))
+
+    def __len__(self):
+        return len(self.lines)
@@ -0,0 +1,298 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+SPILL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS recipients (
+    seq INTEGER PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    fields TEXT
+);
+"""
+
+
+# ================= READERS =================
+def _file_kind(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return "xlsx"
+    if ext == ".csv":
+        return "csv"
+    if ext == ".parquet":
+        return "parquet"
+    raise ValueError(f"Unsupported recipient file type: {ext or filename}")
+
+
+def _xlsx_chunks(source, chunk_rows):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"column_{i}" for i, c in enumerate(header)]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        wb.close()
+
+
+def _parquet_chunks(source, chunk_rows):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Reading Parquet recipient lists requires pyarrow (pip install pyarrow).")
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def iter_chunks(source, filename, chunk_rows=50000):
+    kind = _file_kind(filename)
+    if kind == "xlsx":
+        chunks = _xlsx_chunks(source, chunk_rows)
+    elif kind == "csv":
+        chunks = pd.read_csv(source, dtype=str, chunksize=chunk_rows)
+    else:
+        chunks = _parquet_chunks(source, chunk_rows)
+    for chunk in chunks:
+        chunk.columns = chunk.columns.astype(str).str.lower().str.strip()
+        yield chunk
+
+
+def normalize_emails(series):
+    return series.astype("string").str.strip().str.lower().fillna("")
+
+
+# ================= VALIDATION =================
+EMAIL_PATTERN = re.compile(
+    r"[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59})"
+)
+
+ROLE_ACCOUNTS = frozenset([
+    "abuse", "admin", "administrator", "billing", "careers", "contact", "enquiries", "enquiry",
+    "help", "hello", "hr", "info", "jobs", "mail", "marketing", "no-reply", "noreply", "office",
+    "postmaster", "recruitment", "sales", "support", "team", "webmaster",
+])
+
+DISPOSABLE_DOMAINS = frozenset([
+    "10minutemail.com", "dispostable.com", "fakeinbox.com", "getnada.com", "guerrillamail.com",
+    "guerrillamail.net", "mailinator.com", "maildrop.cc", "mintemail.com", "mohmal.com",
+    "sharklasers.com", "temp-mail.org", "tempmail.com", "throwawaymail.com", "trashmail.com",
+    "yopmail.com",
+])
+
+
+def load_domain_list(path):
+    if not path or not os.path.exists(path):
+        return DISPOSABLE_DOMAINS
+    with open(path, "r", encoding="utf-8") as f:
+        extra = {line.strip().lower() for line in f if line.strip() and not line.startswith("#")}
+    return DISPOSABLE_DOMAINS | extra
+
+
+def _ascii_domain(domain):
+    try:
+        return domain.encode("idna").decode("ascii")
+    except UnicodeError:
+        return ""
+
+
+def validate_emails(series, disposable_domains=DISPOSABLE_DOMAINS, reject_role=False):
+    # Returns (cleaned emails, reject reason or "", role-account mask), all aligned to
+    # the input index. Everything is column-wise; only distinct IDN domains hit Python.
+    emails = normalize_emails(series)
+    if emails.empty:
+        return emails, pd.Series("", index=emails.index, dtype=object), pd.Series(False, index=emails.index)
+    parts = emails.str.rpartition("@")
+    local, domain = parts[0], parts[2]
+
+    idn = ~domain.str.isascii()
+    if idn.any():
+        converted = {d: _ascii_domain(d) for d in domain[idn].unique()}
+        domain = domain.where(~idn, domain.map(converted))
+        emails = emails.where(~idn, local + "@" + domain)
+
+    role = local.str.replace(r"\+.*$", "", regex=True).isin(ROLE_ACCOUNTS)
+    checks = [
+        (emails == "", "missing email"),
+        (~emails.str.fullmatch(EMAIL_PATTERN).fillna(False), "invalid syntax"),
+        ((emails.str.len() > 254) | (local.str.len() > 64), "too long"),
+        (domain.isin(disposable_domains), "disposable domain"),
+    ]
+    if reject_role:
+        checks.append((role, "role account"))
+
+    reason = pd.Series("", index=emails.index, dtype=object)
+    for mask, label in checks:
+        reason = reason.mask(mask.astype(bool) & (reason == ""), label)
+    return emails, reason, role
+
+
+# ================= SPILLED RECIPIENT LIST =================
+class RecipientList:
+    # A cleaned, de-duplicated recipient list spilled to a small SQLite file so the
+    # send engine can stream it in order without holding it in memory.
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.executescript(SPILL_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def email_column(self):
+        return self._meta("email_column")
+
+    @property
+    def columns(self):
+        return json.loads(self._meta("columns") or "[]")
+
+    def summary(self):
+        rows = self.conn.execute("SELECT key, value FROM meta WHERE key IN ('raw_rows', 'rejected', 'role_accounts')").fetchall()
+        summary = {k: int(v) for k, v in rows}
+        summary["valid"] = len(self)
+        return summary
+
+    @property
+    def fingerprint(self):
+        # Hash of the cleaned list in send order; resume checkpoints only apply to the same list.
+        return self._meta("fingerprint")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM recipients").fetchone()[0]
+
+    def count_through(self, position):
+        return self.conn.execute("SELECT COUNT(*) FROM recipients WHERE seq <= ?", (position,)).fetchone()[0]
+
+    def positions(self, emails):
+        positions = {}
+        emails = list(emails)
+        for i in range(0, len(emails), 500):
+            batch = emails[i:i + 500]
+            positions.update(self.conn.execute(
+                f"SELECT email, seq FROM recipients WHERE email IN ({','.join('?' * len(batch))})", batch
+            ))
+        return positions
+
+    def iter_from(self, position=0, batch_size=5000, fields=False):
+        # (seq, email) batches after `position`, in send order; (seq, email, fields) with fields=True.
+        cursor = self.conn.cursor()
+        columns = "seq, email, fields" if fields else "seq, email"
+        cursor.execute(f"SELECT {columns} FROM recipients WHERE seq > ? ORDER BY seq", (position,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            if fields:
+                rows = [(seq, email, json.loads(f) if f else {}) for seq, email, f in rows]
+            yield rows
+
+    def fields_for(self, emails):
+        found = {}
+        emails = list(emails)
+        for i in range(0, len(emails), 500):
+            batch = emails[i:i + 500]
+            for email, fields in self.conn.execute(
+                f"SELECT email, fields FROM recipients WHERE email IN ({','.join('?' * len(batch))})", batch
+            ):
+                found[email] = json.loads(fields) if fields else {}
+        return found
+
+
+def ingest_recipients(source, filename, out_path, chunk_rows=50000, rejects_path=None,
+                      disposable_domains=DISPOSABLE_DOMAINS, reject_role=False):
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    recipients = RecipientList(out_path)
+    conn = recipients.conn
+    email_col = None
+    counts = {"raw_rows": 0, "rejected": 0, "role_accounts": 0}
+    rejects_file = None
+    conn.execute("BEGIN")
+    try:
+        for chunk in iter_chunks(source, filename, chunk_rows):
+            if email_col is None:
+                email_col = next((c for c in chunk.columns if "email" in c), None)
+                if not email_col:
+                    raise ValueError("No email column found.")
+                conn.execute("INSERT INTO meta (key, value) VALUES ('email_column', ?)", (email_col,))
+                conn.execute("INSERT INTO meta (key, value) VALUES ('columns', ?)", (json.dumps(list(chunk.columns)),))
+
+            # Spreadsheet row numbers: 1-based, after the header row.
+            chunk.index = range(counts["raw_rows"] + 2, counts["raw_rows"] + 2 + len(chunk))
+            counts["raw_rows"] += len(chunk)
+            blank = chunk[email_col].isna() | (chunk[email_col].astype("string").str.strip() == "")
+            chunk = chunk[~blank]
+            emails, reason, role = validate_emails(chunk[email_col], disposable_domains, reject_role)
+
+            rejected = reason != ""
+            if rejected.any():
+                counts["rejected"] += int(rejected.sum())
+                if rejects_path:
+                    if rejects_file is None:
+                        rejects_file = open(rejects_path, "w", newline="", encoding="utf-8")
+                        csv.writer(rejects_file).writerow(["Row", "Email", "Reason"])
+                    bad = pd.DataFrame({"Row": chunk.index[rejected], "Email": chunk[email_col][rejected], "Reason": reason[rejected]})
+                    bad.to_csv(rejects_file, header=False, index=False)
+
+            chunk = chunk.assign(**{email_col: emails})[~rejected].drop_duplicates(subset=[email_col])
+            counts["role_accounts"] += int(role[chunk.index].sum())
+            if chunk.empty:
+                continue
+            # Duplicates across chunks are dropped by the UNIQUE constraint on disk.
+            fields = chunk.to_json(orient="records", lines=True, date_format="iso").splitlines()
+            conn.executemany(
+                "INSERT OR IGNORE INTO recipients (email, fields) VALUES (?, ?)",
+                zip(chunk[email_col].tolist(), fields),
+            )
+        if email_col is None:
+            raise ValueError("No email column found.")
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in counts.items()])
+        digest = hashlib.sha256()
+        for (email,) in conn.execute("SELECT email FROM recipients ORDER BY seq"):
+            digest.update(email.encode() + b"\n")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('fingerprint', ?)", (digest.hexdigest(),))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        recipients.close()
+        os.remove(out_path)
+        raise
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+    return recipients
+
+
+def prune_recipient_lists(directory, max_age_hours, keep=()):
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if path not in keep and os.path.getmtime(path) < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
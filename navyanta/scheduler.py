@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+
+
+def email_domain(email):
+    return email.rpartition("@")[2]
+
+
+class DomainScheduler:
+    # Sits between the cleaned recipient stream and the sender pool. It buffers up to
+    # `window` recipients, groups them by domain and hands them out round-robin
+    # (a domain with weight N gets N turns per round), honouring a per-domain rate cap
+    # and an exponential per-domain backoff while that domain is deferring. Once a
+    # backoff ends the domain gets a single probe send at a time until one succeeds.
+    # Iterating yields None while nothing is ready, so the consumer can check for stop.
+    # Every recipient handed out must come back through settle() or defer(); the pass
+    # only ends once nothing is buffered or outstanding, since a deferral can requeue.
+    def __init__(self, domain_rate=0, rate_overrides=None, weights=None, window=5000,
+                 base_backoff=30, max_backoff=900, max_defers=5, tick=0.2):
+        self.domain_rate = domain_rate
+        self.rate_overrides = rate_overrides or {}
+        self.weights = weights or {}
+        self.window = max(1, window)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_defers = max_defers
+        self.tick = tick
+        self.queues = {}
+        self.order = deque()
+        self.credits = {}
+        self.ready_at = {}
+        self.backoff = {}
+        self.deferrals = {}
+        self.defer_counts = {}
+        self.in_flight = {}
+        self.buffered = 0
+        self.outstanding = 0
+        self.drained = False # set once a pass has handed out and settled every recipient
+        self.lock = threading.Lock()
+
+    def _interval(self, domain):
+        rate = self.rate_overrides.get(domain, self.domain_rate)
+        return 60.0 / rate if rate else 0
+
+    def _enqueue(self, email, front=False):
+        domain = email_domain(email)
+        q = self.queues.get(domain)
+        if q is None:
+            q = self.queues[domain] = deque()
+            self.order.append(domain)
+            self.credits[domain] = self.weights.get(domain, 1)
+        if front:
+            q.appendleft(email)
+        else:
+            q.append(email)
+        self.buffered += 1
+
+    def _probing(self, domain):
+        # Backed off and not yet answered a send successfully: one send at a time.
+        return domain in self.backoff and self.in_flight.get(domain, 0) > 0
+
+    def _done(self, domain):
+        count = self.in_flight.get(domain, 0) - 1
+        if count > 0:
+            self.in_flight[domain] = count
+        else:
+            self.in_flight.pop(domain, None)
+
+    def _pick(self, now):
+        for _ in range(len(self.order)):
+            if not self.order:
+                break
+            domain = self.order[0]
+            q = self.queues[domain]
+            if not q:
+                self.order.popleft()
+                del self.queues[domain]
+                self.credits.pop(domain, None)
+                continue
+            if self.ready_at.get(domain, 0) <= now and not self._probing(domain):
+                email = q.popleft()
+                self.buffered -= 1
+                self.outstanding += 1
+                self.in_flight[domain] = self.in_flight.get(domain, 0) + 1
+                self.ready_at[domain] = now + self._interval(domain)
+                self.credits[domain] -= 1
+                if self.credits[domain] <= 0:
+                    self.credits[domain] = self.weights.get(domain, 1)
+                    self.order.rotate(-1)
+                return email, 0
+            self.credits[domain] = self.weights.get(domain, 1)
+            self.order.rotate(-1)
+        waits = [self.ready_at.get(d, 0) - now for d in self.order if self.queues[d] and not self._probing(d)]
+        return None, min(waits) if waits else self.tick
+
+    def schedule(self, recipients):
+        # Buffered recipients belong to this pass only; domain backoff carries over.
+        with self.lock:
+            self.queues.clear()
+            self.order.clear()
+            self.credits.clear()
+            self.in_flight.clear()
+            self.buffered = 0
+            self.outstanding = 0
+            self.drained = False
+        it = iter(recipients)
+        exhausted = False
+        while True:
+            # The recipient stream reads the list and the ledger, so it is consumed
+            # outside the lock; settle() and defer() never wait on it.
+            with self.lock:
+                room = self.window - self.buffered
+            batch = []
+            while not exhausted and len(batch) < room:
+                email = next(it, None)
+                if email is None:
+                    exhausted = True
+                else:
+                    batch.append(email)
+            with self.lock:
+                for email in batch:
+                    self._enqueue(email)
+                email, wait = self._pick(time.monotonic())
+                if email is None and exhausted and not self.buffered and not self.outstanding:
+                    self.drained = True
+                    return
+            if email is not None:
+                yield email
+            else:
+                time.sleep(min(max(wait, 0.01), self.tick))
+                yield None
+
+    def defer(self, email):
+        # A recipient's domain answered 4xx: back off that domain and requeue the
+        # recipient at the front of its queue. Returns False once it has used up max_defers.
+        domain = email_domain(email)
+        with self.lock:
+            count = self.defer_counts.get(email, 0) + 1
+            self.defer_counts[email] = count
+            self.deferrals[domain] = self.deferrals.get(domain, 0) + 1
+            now = time.monotonic()
+            # Sends already in flight when the domain started deferring come back here
+            # too; only the first of them escalates the backoff.
+            if self.ready_at.get(domain, 0) <= now:
+                backoff = min(self.max_backoff, self.backoff.get(domain, self.base_backoff / 2) * 2)
+                self.backoff[domain] = backoff
+                self.ready_at[domain] = now + backoff
+            if count > self.max_defers:
+                return False
+            self.outstanding -= 1
+            self._done(domain)
+            self._enqueue(email, front=True)
+            return True
+
+    def settle(self, email, success):
+        with self.lock:
+            domain = email_domain(email)
+            self.outstanding -= 1
+            self._done(domain)
+            if success:
+                self.backoff.pop(domain, None)
+
+    def snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            backing_off = sorted(
+                ((d, self.ready_at.get(d, 0) - now) for d in self.backoff if self.ready_at.get(d, 0) > now),
+                key=lambda x: -x[1],
+            )
+            return {
+                "domains": len(self.queues),
+                "buffered": self.buffered,
+                "deferrals": sum(self.deferrals.values()),
+                "backing_off": backing_off,
+            }
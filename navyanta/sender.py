@@ -0,0 +1,316 @@
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+from navyanta.connection import ConnectionStats, ManagedConnection
+from navyanta.failures import CONNECTION, AUTH, DEFERRED, RELAY_FAILURES, RETRYABLE, CircuitBreaker, backoff_delay, classify
+from navyanta.metrics import Metrics
+
+# errors is a list of (attempt, category, detail); category is the last error's category.
+SendResult = namedtuple("SendResult", ["email", "success", "errors", "worker_id", "attempts", "duration", "category"])
+
+_DONE = object()
+
+
+# ================= RATE LIMITING =================
+class TokenBucket:
+    # Shared across all workers so the campaign-wide rate is a policy, not a sleep.
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = rate_per_minute / 60.0 if rate_per_minute else 0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def poll(self):
+        # Takes a token and returns 0, or returns the seconds until one is due.
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, stop_event=None):
+        while True:
+            wait = self.poll()
+            if not wait:
+                return True
+            if stop_event is None:
+                time.sleep(wait)
+            elif stop_event.wait(wait):
+                return False
+
+
+# ================= WORKER POOL =================
+class WorkerStats:
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.sent = 0
+        self.failed = 0
+        self.reconnects = 0
+        self.busy_seconds = 0.0
+        self.started = time.monotonic()
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.started
+        return self.sent / elapsed * 60 if elapsed > 0 else 0
+
+
+class SenderPool:
+    # claim(emails) is called with each batch of recipients before any of them is
+    # handed to a worker; release(emails) gets back the claimed ones that were never
+    # attempted because the pool stopped first.
+    # Recipients that only failed because the relay was unhealthy are requeued (up to
+    # max_requeues times) behind the circuit breaker instead of being marked failed.
+    # defer(email), if given, takes recipients whose domain answered 4xx at RCPT (so the
+    # scheduler can back that domain off); it returns False to have them recorded as failed.
+    # The recipient iterable may yield None as an idle tick while it has nothing ready.
+    # keep(server) is checked before each send; a session it rejects is reopened via connect().
+    # A pool runs once: a stop() that lands before run() still stops it.
+    def __init__(self, connect, send, size=1, bucket=None, record=None,
+                 retry_count=2, retry_delay=5, logger=None,
+                 claim=None, release=None, claim_batch=1,
+                 breaker=None, retry_max_delay=60, max_requeues=3,
+                 probe_idle=15, conn_stats=None, defer=None, keep=None, metrics=None):
+        self.connect = connect
+        self.send = send
+        self.size = max(1, size)
+        self.bucket = bucket or TokenBucket(0)
+        self.record = record
+        self.retry_count = max(1, retry_count)
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.max_requeues = max_requeues
+        self.requeued = deque()
+        self.requeue_counts = {}
+        self.probe_idle = probe_idle
+        self.conn_stats = conn_stats or ConnectionStats()
+        self.logger = logger
+        self.claim = claim
+        self.release = release
+        self.defer = defer
+        self.keep = keep
+        self.metrics = metrics or Metrics()
+        self.claim_batch = max(1, claim_batch)
+        self.unsent = []
+        self.feed_error = None
+        self.stats = [WorkerStats(i + 1) for i in range(self.size)]
+        self.stop_event = threading.Event()
+        self.record_lock = threading.Lock()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self, recipients):
+        self.unsent = []
+        self.feed_error = None
+        self.requeued.clear()
+        self.requeue_counts = {}
+        self.breaker.release_probe()
+        # Connect up front so SMTP/auth errors surface to the caller before any send.
+        conns = []
+        try:
+            for _ in range(self.size):
+                conn = ManagedConnection(self.connect, self.conn_stats, self.probe_idle, self.keep, self.metrics)
+                conn.open()
+                conns.append(conn)
+        except Exception:
+            for conn in conns:
+                conn.close()
+            raise
+
+        inbox = queue.Queue(maxsize=self.size * 2)
+        outbox = queue.Queue()
+        threads = [threading.Thread(target=self._feed, args=(recipients, inbox), daemon=True)]
+        for i, conn in enumerate(conns):
+            threads.append(threading.Thread(target=self._work, args=(self.stats[i], conn, inbox, outbox), daemon=True))
+        for t in threads:
+            t.start()
+
+        live = self.size
+        try:
+            while live:
+                item = outbox.get()
+                if item is _DONE:
+                    live -= 1
+                    continue
+                yield item
+            if self.feed_error:
+                raise self.feed_error
+        finally:
+            self.stop_event.set()
+            for t in threads:
+                t.join()
+            self.unsent.extend(self.requeued)
+            self.requeued.clear()
+            while True:
+                try:
+                    item = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _DONE:
+                    self.unsent.append(item)
+            if self.release and self.unsent:
+                self.release(self.unsent)
+
+    def _put(self, q, item):
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _feed(self, recipients, inbox):
+        try:
+            batch = []
+            for email in recipients:
+                if self.stop_event.is_set():
+                    self.unsent.extend(batch)
+                    return
+                if email is not None:
+                    batch.append(email)
+                if batch and (email is None or len(batch) >= self.claim_batch):
+                    if not self._hand_out(batch, inbox):
+                        return
+                    batch = []
+            if batch and not self._hand_out(batch, inbox):
+                return
+        except Exception as e:
+            self.feed_error = e
+            self.stop_event.set()
+            return
+        for _ in range(self.size):
+            if not self._put(inbox, _DONE):
+                return
+
+    def _hand_out(self, batch, inbox):
+        if self.claim:
+            self.claim(batch)
+        for n, email in enumerate(batch):
+            if not self._put(inbox, email):
+                self.unsent.extend(batch[n:])
+                return False
+        return True
+
+    def _next(self, inbox, finishing):
+        try:
+            return self.requeued.popleft()
+        except IndexError:
+            pass
+        if finishing:
+            return _DONE
+        try:
+            return inbox.get(timeout=0.2)
+        except queue.Empty:
+            return None
+
+    def _attempt_failed(self, email, attempt, exc, errors):
+        category, detail = classify(exc)
+        errors.append((attempt, category, detail))
+        self.metrics.inc("errors", category=category)
+        self.breaker.record_failure(category)
+        if self.logger:
+            self.logger.error(f"Attempt {attempt} failed for {email} [{category}]: {detail}")
+        return category
+
+    def _retry_delay(self, category, attempt):
+        # Backoff before the next attempt, or None if this recipient gets no more attempts here.
+        if category == DEFERRED and self.defer:
+            return None
+        if category not in RETRYABLE or attempt >= self.retry_count:
+            return None
+        self.metrics.inc("retries", category=category)
+        return backoff_delay(attempt, self.retry_delay, self.retry_max_delay)
+
+    def _settle(self, stats, conn, email, success, errors, category, attempt, duration):
+        # After the last attempt: the SendResult to record, or None if the recipient was
+        # handed to defer() or requeued behind the breaker instead.
+        stats.busy_seconds += duration
+        if not success and category == DEFERRED and self.defer and self.defer(email):
+            self.metrics.inc("messages", result="deferred")
+            return None
+        if not success and category in RELAY_FAILURES:
+            requeues = self.requeue_counts.get(email, 0)
+            if requeues < self.max_requeues:
+                self.requeue_counts[email] = requeues + 1
+                self.metrics.inc("messages", result="requeued")
+                self.requeued.append(email)
+                return None
+        stats.reconnects = conn.opens - 1
+        if success:
+            stats.sent += 1
+        else:
+            stats.failed += 1
+        self.metrics.inc("messages", result="sent" if success else "failed")
+        return SendResult(email, success, errors, stats.worker_id, attempt, duration, category if not success else None)
+
+    def _work(self, stats, conn, inbox, outbox):
+        finishing = False
+        try:
+            while not self.stop_event.is_set():
+                email = self._next(inbox, finishing)
+                if email is None:
+                    continue
+                if email is _DONE:
+                    # Exit only once the list is exhausted and nothing is waiting to be retried.
+                    if self.requeued:
+                        finishing = True
+                        continue
+                    break
+                with self.metrics.time("rate_wait"):
+                    acquired = self.bucket.acquire(self.stop_event)
+                if not acquired:
+                    self.unsent.append(email)
+                    break
+
+                send_start = time.monotonic()
+                errors = []
+                success = False
+                category = None
+                attempt = 0
+                for attempt in range(1, self.retry_count + 1):
+                    with self.metrics.time("breaker_wait"):
+                        closed = self.breaker.wait(self.stop_event)
+                    if not closed:
+                        break
+                    try:
+                        self.send(conn.acquire(), email)
+                        conn.used()
+                        success = True
+                        self.breaker.record_success()
+                        break
+                    except Exception as e:
+                        category = self._attempt_failed(email, attempt, e, errors)
+                        if category in (CONNECTION, AUTH):
+                            conn.drop(category)
+                        delay = self._retry_delay(category, attempt)
+                        if delay is None:
+                            break
+                        with self.metrics.time("retry_sleep"):
+                            interrupted = self.stop_event.wait(delay)
+                        if interrupted:
+                            break
+
+                if not success and self.stop_event.is_set():
+                    # Interrupted mid-retry: leave it unrecorded so a resume picks it up.
+                    self.unsent.append(email)
+                    break
+                result = self._settle(stats, conn, email, success, errors, category, attempt, time.monotonic() - send_start)
+                if result is None:
+                    continue
+                if self.record:
+                    with self.record_lock:
+                        self.record(result)
+                outbox.put(result)
+        finally:
+            conn.close()
+            outbox.put(_DONE)
@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+import uuid
+
+from navyanta.progress import ActivityLog
+
+
+# ================= JOBS =================
+class CampaignJob:
+    # States: queued, running, paused, completed, stopped, failed
+    def __init__(self, campaign_id, campaign_name, run, recipients_path=None):
+        self.job_id = str(uuid.uuid4())
+        self.campaign_id = campaign_id
+        self.campaign_name = campaign_name
+        self.run = run
+        self.recipients_path = recipients_path
+        self.state = "queued"
+        self.error = None
+        self.total = 0
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started = None
+        self.finished = None
+        self.report_path = None
+        self.pool = None
+        self.scheduler = None
+        self.accounts = {}
+        self.metrics = None
+        self.metrics_path = None
+        self.activity = ActivityLog(200)
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+        self.stop_event = threading.Event()
+
+    def log(self, msg):
+        self.activity.log(msg)
+
+    def processed(self):
+        return self.sent + self.skipped + self.failed
+
+    def speed(self):
+        if not self.started:
+            return 0
+        elapsed = (self.finished or time.time()) - self.started
+        return (self.sent + self.failed) / elapsed * 60 if elapsed > 0 else 0
+
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def paused(self):
+        return not self.resume_event.is_set()
+
+    def wait_if_paused(self):
+        # Blocks while paused; returns False if the job was stopped instead of resumed.
+        while not self.resume_event.wait(0.5):
+            if self.stopped():
+                return False
+        return not self.stopped()
+
+    def _interrupt_pool(self):
+        pool = self.pool
+        if pool is not None:
+            pool.stop()
+
+    def pause(self):
+        if self.state in ("queued", "running"):
+            self.resume_event.clear()
+            self._interrupt_pool()
+            if self.state == "running":
+                self.state = "paused"
+
+    def resume(self):
+        if self.state == "paused" or not self.resume_event.is_set():
+            self.resume_event.set()
+            if self.state == "paused":
+                self.state = "running"
+
+    def stop(self):
+        self.stop_event.set()
+        self.resume_event.set()
+        self._interrupt_pool()
+        if self.state == "queued":
+            self.state = "stopped"
+
+
+class CampaignManager:
+    # Runs submitted campaigns on background threads so they outlive the Streamlit
+    # script run (and the browser session) that started them.
+    def __init__(self, concurrency=1, logger=None):
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.logger = logger
+        self.lock = threading.Lock()
+        for _ in range(max(1, concurrency)):
+            threading.Thread(target=self._runner, daemon=True).start()
+
+    def submit(self, campaign_id, campaign_name, run, recipients_path=None):
+        job = CampaignJob(campaign_id, campaign_name, run, recipients_path)
+        with self.lock:
+            self.jobs[job.job_id] = job
+        self.queue.put(job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def active(self):
+        return [job for job in list(self.jobs.values()) if job.state in ("queued", "running", "paused")]
+
+    def _runner(self):
+        while True:
+            job = self.queue.get()
+            if job.stopped():
+                job.state = "stopped"
+                continue
+            job.state = "paused" if job.paused() else "running"
+            job.started = time.time()
+            try:
+                # run returns the status run_campaign recorded in the ledger.
+                status = job.run(job)
+                if status == "Completed":
+                    job.state = "completed"
+                elif status == "Stopped":
+                    job.state = "stopped"
+                else:
+                    job.error = f"Campaign ended as {status}"
+                    job.state = "failed"
+            except Exception as e:
+                job.error = str(e)
+                job.state = "failed"
+                if self.logger:
+                    self.logger.error(f"Campaign {job.campaign_name} failed: {e}")
+            finally:
+                job.pool = None
+                job.finished = time.time()
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from smtp_sink import SMTPSink
+
+from navyanta.accounts import AccountPool, QuotaExhausted, SenderAccount
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class AccountPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="navyanta_accounts_")
+        self.path = os.path.join(self.dir, "accounts.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def account(self, email, **kwargs):
+        return SenderAccount(email, "", host="127.0.0.1", use_tls=False, **kwargs)
+
+    def test_quota_and_refund(self):
+        pool = AccountPool([self.account("a@x.com", daily_quota=2)], self.path)
+        self.assertTrue(pool.reserve("a@x.com"))
+        self.assertTrue(pool.reserve("a@x.com"))
+        self.assertFalse(pool.reserve("a@x.com"))
+        self.assertFalse(pool.usable("a@x.com"))
+        self.assertGreater(pool.next_available_in(), 0)
+        pool.refund("a@x.com")
+        self.assertEqual(pool.remaining("a@x.com"), 1)
+        self.assertTrue(pool.reserve("a@x.com"))
+        pool.close()
+
+        # Usage survives a restart.
+        pool = AccountPool([self.account("a@x.com", daily_quota=2)], self.path)
+        self.assertEqual(pool.remaining("a@x.com"), 0)
+        pool.close()
+
+    def test_quota_is_shared_between_processes(self):
+        # Two pools on one file stand in for the app and a CLI run.
+        first = AccountPool([self.account("a@x.com", hourly_quota=3)], self.path)
+        second = AccountPool([self.account("a@x.com", hourly_quota=3)], self.path)
+        self.assertTrue(first.reserve("a@x.com"))
+        self.assertTrue(second.reserve("a@x.com"))
+        self.assertTrue(first.reserve("a@x.com"))
+        self.assertFalse(second.reserve("a@x.com"))
+        second.refund("a@x.com")
+        self.assertTrue(first.reserve("a@x.com"))
+        self.assertEqual(second.snapshot()[0]["sent_hour"], 3)
+        first.close()
+        second.close()
+
+    def test_suspended_accounts_are_skipped(self):
+        pool = AccountPool([self.account("a@x.com"), self.account("b@x.com")], self.path, suspend_seconds=60)
+        pool.suspend("a@x.com", "rate limited")
+        self.assertFalse(pool.usable("a@x.com"))
+        self.assertEqual([a.email for a in pool._ranked()], ["b@x.com"])
+        self.assertEqual(pool.throttled["a@x.com"], 1)
+        pool.suspend("b@x.com", "rate limited")
+        with self.assertRaises(QuotaExhausted):
+            pool.connect(1)
+        pool.close()
+
+    def test_connect_fails_over_when_an_account_is_unreachable(self):
+        sink = SMTPSink().start()
+        try:
+            down = self.account("down@x.com", port=closed_port(), daily_quota=1000)
+            up = self.account("up@x.com", port=sink.port, daily_quota=1)
+            for name in ("sync", "async"):
+                with self.subTest(engine=name):
+                    pool = AccountPool([down, up], os.path.join(self.dir, f"{name}.db"), suspend_seconds=60)
+                    if name == "sync":
+                        server = pool.connect(2)
+                    else:
+                        server = asyncio.run(pool.connect_async(2))
+                    self.assertEqual(server.account.email, "up@x.com")
+                    self.assertFalse(pool.usable("down@x.com"))
+                    pool.close()
+        finally:
+            sink.shutdown()
+            sink.server_close()
+
+    def test_last_unreachable_account_is_not_suspended(self):
+        pool = AccountPool([self.account("down@x.com", port=closed_port())], self.path)
+        with self.assertRaises(OSError):
+            pool.connect(2)
+        self.assertTrue(pool.usable("down@x.com"))
+        pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
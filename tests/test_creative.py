@@ -0,0 +1,31 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.creative import CreativeStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+class CreativeStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="navyanta_creative_")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_nothing_is_cached_on_disk_without_pillow(self):
+        with mock.patch.dict(sys.modules, {"PIL": None, "PIL.Image": None}):
+            store = CreativeStore(self.dir)
+            creative = store.put(PNG)
+        self.assertEqual(creative.data, PNG)
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import smtplib
+import socket
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.failures import AUTH, CONNECTION, DEFERRED, PERMANENT, THROTTLED, TRANSIENT, CircuitBreaker, classify
+
+
+class ClassifyTest(unittest.TestCase):
+    def test_categories(self):
+        cases = [
+            (smtplib.SMTPDataError(451, b"4.3.0 Temporary local problem"), TRANSIENT),
+            (smtplib.SMTPDataError(550, b"5.1.1 User unknown"), PERMANENT),
+            (smtplib.SMTPDataError(554, b"5.4.5 Daily user sending quota exceeded"), THROTTLED),
+            (smtplib.SMTPDataError(421, b"4.7.0 Try again later, closing connection"), CONNECTION),
+            (smtplib.SMTPDataError(450, b"4.7.28 Too many messages"), THROTTLED),
+            (smtplib.SMTPRecipientsRefused({"a@x.com": (450, b"4.2.1 Mailbox busy")}), DEFERRED),
+            (smtplib.SMTPRecipientsRefused({"a@x.com": (550, b"5.1.1 No such user")}), PERMANENT),
+            (smtplib.SMTPServerDisconnected("Connection unexpectedly closed"), CONNECTION),
+            (socket.timeout("timed out"), CONNECTION),
+            (ConnectionRefusedError(111, "Connection refused"), CONNECTION),
+            (smtplib.SMTPAuthenticationError(535, b"5.7.8 Username and Password not accepted"), AUTH),
+            (smtplib.SMTPSenderRefused(530, b"5.7.0 Authentication Required", "s@x.com"), AUTH),
+        ]
+        for exc, category in cases:
+            with self.subTest(exc=repr(exc)):
+                self.assertEqual(classify(exc)[0], category)
+
+    def test_detail_has_the_reply(self):
+        self.assertEqual(classify(smtplib.SMTPDataError(550, b"5.1.1 User unknown"))[1], "550 5.1.1 User unknown")
+        self.assertEqual(classify(smtplib.SMTPServerDisconnected())[1], "SMTPServerDisconnected")
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_open_half_open_close(self):
+        trips = []
+        breaker = CircuitBreaker(threshold=2, cooldown=0.05, max_cooldown=0.15, on_trip=trips.append)
+        breaker.record_failure(CONNECTION)
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure(PERMANENT) # a recipient-level answer resets the count
+        breaker.record_failure(CONNECTION)
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure(THROTTLED)
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(trips, [THROTTLED])
+        self.assertGreater(breaker.poll(), 0)
+
+        # Cooldown over: exactly one probe goes through.
+        time.sleep(0.06)
+        self.assertEqual(breaker.poll(), 0)
+        self.assertEqual(breaker.state, "half-open")
+        self.assertGreater(breaker.poll(), 0)
+
+        # A failed probe reopens with a doubled cooldown.
+        breaker.record_failure(CONNECTION)
+        self.assertEqual(breaker.state, "open")
+        self.assertAlmostEqual(breaker.cooldown, 0.1)
+        time.sleep(0.11)
+        self.assertEqual(breaker.poll(), 0)
+
+        # A successful probe closes it and resets the cooldown.
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(breaker.cooldown, 0.05)
+        self.assertEqual(breaker.poll(), 0)
+        self.assertEqual(breaker.trips, 2)
+
+    def test_auth_trips_at_once(self):
+        breaker = CircuitBreaker(threshold=5, cooldown=60)
+        breaker.record_failure(AUTH)
+        self.assertEqual(breaker.state, "open")
+
+    def test_recipient_answer_closes_a_half_open_breaker(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+        breaker.record_failure(CONNECTION)
+        time.sleep(0.02)
+        self.assertEqual(breaker.poll(), 0)
+        breaker.record_failure(DEFERRED)
+        self.assertEqual(breaker.state, "closed")
+
+
+if __name__ == "__main__":
+    unittest.main()
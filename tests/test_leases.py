@@ -0,0 +1,103 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.leases import CampaignLocks, SharedTokenBucket
+
+
+class SharedTokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="navyanta_leases_")
+        self.path = os.path.join(self.dir, "leases.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_budget_is_shared_between_connections(self):
+        # Two buckets on one file stand in for the app and a CLI run.
+        buckets = [SharedTokenBucket(self.path, 600) for _ in range(2)]
+        taken = [0, 0]
+        stop = time.monotonic() + 1.0
+
+        def take(i):
+            while buckets[i].acquire() and time.monotonic() < stop:
+                taken[i] += 1
+
+        threads = [threading.Thread(target=take, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 10 tokens a second plus the initial one, not 10 for each bucket.
+        self.assertLessEqual(sum(taken), 12)
+        self.assertGreaterEqual(sum(taken), 9)
+        for bucket in buckets:
+            bucket.close()
+
+
+class CampaignLocksTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="navyanta_leases_")
+        self.path = os.path.join(self.dir, "leases.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_takeover_keeps_a_hung_holder_alive_until_it_releases(self):
+        locks = CampaignLocks(self.path, ttl=0.3)
+        other = CampaignLocks(self.path, ttl=0.3)
+        first = locks.acquire("c")
+        self.assertIsNotNone(first)
+        self.assertIsNone(other.acquire("c"))
+
+        # The first run hangs: its heartbeat stops and the lease expires.
+        first.released.set()
+        first.thread.join()
+        time.sleep(0.35)
+        second = other.acquire("c")
+        self.assertIsNotNone(second)
+        self.assertEqual(second.reclaimed_from, first.owner)
+        self.assertTrue(other.alive(first.owner))
+
+        first.lost = True
+        first.release()
+        self.assertFalse(other.alive(first.owner))
+        self.assertFalse(other.alive(None))
+        self.assertEqual(other.holder("c")[0], second.owner)
+        second.release()
+        self.assertIsNone(other.holder("c"))
+        locks.close()
+        other.close()
+
+    def test_live_lease_of_an_exited_process_is_reclaimed(self):
+        locks = CampaignLocks(self.path, ttl=30)
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        crashed = f"{socket.gethostname()}:{dead.pid}:crashed"
+        elsewhere = "other-host:1:remote"
+        now = time.time()
+        with locks.lock:
+            for name, owner in (("local", crashed), ("remote", elsewhere)):
+                locks.conn.execute(
+                    "INSERT INTO campaign_leases (campaign_name, owner, acquired, expires) VALUES (?, ?, ?, ?)", (name, owner, now, now + 30)
+                )
+
+        lease = locks.acquire("local")
+        self.assertIsNotNone(lease)
+        self.assertEqual(lease.reclaimed_from, crashed)
+        # A run on another host can only be judged by its lease.
+        self.assertIsNone(locks.acquire("remote"))
+        lease.release()
+        locks.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.ledger import LedgerStore, ResumeCursor
+
+
+class LedgerClaimTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="navyanta_ledger_")
+        self.path = os.path.join(self.dir, "ledger.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_unrecorded_claims_are_in_doubt_after_a_crash(self):
+        for durability in ("strict", "group"):
+            with self.subTest(durability=durability):
+                ledger = LedgerStore(self.path, durability=durability, flush_rows=1000)
+                ledger.claim(durability, ["a@x.com", "b@x.com", "c@x.com"])
+                ledger.log_sent("id", durability, "a@x.com", "2026-01-01T00:00:00")
+                ledger.flush()
+                ledger.conn.close() # crash: no release, no close()
+
+                ledger = LedgerStore(self.path, durability=durability)
+                self.assertEqual(sorted(ledger.resolve_in_doubt("id", durability)), ["b@x.com", "c@x.com"])
+                self.assertEqual(ledger.sent_emails(durability), {"a@x.com"})
+                self.assertEqual(set(ledger.in_doubt_emails(durability)), {"b@x.com", "c@x.com"})
+                ledger.close()
+
+    def test_claims_of_a_live_owner_are_not_resolved(self):
+        ledger = LedgerStore(self.path)
+        ledger.claim("c", ["a@x.com"], "live")
+        ledger.claim("c", ["b@x.com"], "dead")
+        ledger.claim("c", ["c@x.com"])
+        self.assertEqual(sorted(ledger.resolve_in_doubt("id", "c", alive=lambda owner: owner == "live")), ["b@x.com", "c@x.com"])
+        self.assertEqual(ledger.inflight_emails("c"), {"a@x.com"})
+        ledger.log_sent("id", "c", "a@x.com", "2026-01-01T00:00:00")
+        self.assertEqual(ledger.inflight_emails("c"), set())
+        ledger.close()
+
+    def test_checkpoint_only_applies_to_the_same_list(self):
+        ledger = LedgerStore(self.path)
+        ledger.save_checkpoint("c", "list-a", 40)
+        ledger.flush()
+        self.assertEqual(ledger.checkpoint("c", "list-a"), 40)
+        self.assertEqual(ledger.checkpoint("c", "list-b"), 0)
+        self.assertEqual(ledger.checkpoint("other", "list-a"), 0)
+        ledger.save_checkpoint("c", "list-a", 55)
+        ledger.flush()
+        self.assertEqual(ledger.checkpoint("c", "list-a"), 55)
+        ledger.close()
+
+
+class ResumeCursorTest(unittest.TestCase):
+    def test_mark_stops_below_the_first_unresolved_position(self):
+        cursor = ResumeCursor()
+        for seq in range(1, 6):
+            cursor.issue(seq)
+        self.assertEqual(cursor.mark(), 0)
+        # Results arrive out of order: 1, 2 and 4 are done, 3 is still sending.
+        for seq in (2, 4, 1):
+            cursor.resolve(seq)
+        self.assertEqual(cursor.mark(), 2)
+        cursor.resolve(3)
+        self.assertEqual(cursor.mark(), 4)
+        cursor.resolve(5)
+        self.assertEqual(cursor.mark(), 5)
+
+    def test_skipped_positions_do_not_hold_the_mark(self):
+        cursor = ResumeCursor(10)
+        cursor.issue(11, pending=False) # already sent
+        cursor.issue(12)
+        cursor.issue(13, pending=False)
+        self.assertEqual(cursor.mark(), 11)
+        cursor.resolve(12)
+        self.assertEqual(cursor.mark(), 13)
+
+    def test_rewind_releases_unsent_positions(self):
+        cursor = ResumeCursor()
+        for seq in range(1, 5):
+            cursor.issue(seq)
+        cursor.resolve(1)
+        cursor.resolve(3)
+        # 2 and 4 were handed back unsent (pause or deferral): the next pass starts after 1.
+        self.assertEqual(cursor.rewind(), 1)
+        self.assertEqual(cursor.mark(), 1)
+        cursor.issue(2)
+        cursor.resolve(2)
+        self.assertEqual(cursor.mark(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import re
+import sys
+import unittest
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.message import SMTP_POLICY, MessageTemplate
+
+SENDER = "sender@example.com"
+HTML = "<html><body><p>Hello candidate, café &amp; more.</p></body></html>"
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 20
+
+
+def legacy_message(to_email, subject, html, image_bytes, boundaries):
+    # The per-recipient MIME tree send_email() used to build, with the template's
+    # boundaries so the two can be compared byte for byte.
+    msg = MIMEMultipart("related", boundary=boundaries[0])
+    msg["From"] = SENDER
+    msg["To"] = to_email
+    msg["Subject"] = subject.strip()
+    alt = MIMEMultipart("alternative", boundary=boundaries[1])
+    msg.attach(alt)
+    alt.attach(MIMEText(html, "html"))
+    if image_bytes:
+        attachment = MIMEImage(image_bytes)
+        attachment.add_header("Content-ID", "<creative>")
+        attachment.add_header("Content-Disposition", "inline", filename="Navyanta Recruitment Flyer.png")
+        msg.attach(attachment)
+    return msg.as_bytes(policy=SMTP_POLICY)
+
+
+class MessageTemplateTest(unittest.TestCase):
+    def test_matches_the_per_recipient_mime_path(self):
+        for image_bytes in (None, PNG):
+            with self.subTest(image=bool(image_bytes)):
+                template = MessageTemplate(SENDER, " Job Opportunity ", HTML, image_bytes)
+                for to_email in ("a@example.com", "someone.else@example.org"):
+                    rendered = template.render(to_email)
+                    boundaries = re.findall(rb'boundary="([^"]+)"', rendered)
+                    expected = legacy_message(to_email, " Job Opportunity ", HTML, image_bytes, [b.decode() for b in boundaries])
+                    self.assertEqual(rendered, expected)
+
+    def test_for_sender_only_changes_from(self):
+        template = MessageTemplate(SENDER, "Subject", HTML, PNG)
+        other = template.for_sender("other@example.com")
+        self.assertEqual(
+            other.render("a@example.com"),
+            template.render("a@example.com").replace(b"From: sender@example.com\r\n", b"From: other@example.com\r\n", 1),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.config import load_config
+from navyanta.engine import Engine
+from navyanta.personalize import CompiledTemplate, merge_fields
+
+
+def render(source, row):
+    template = CompiledTemplate(source)
+    return template.render(template.bind(row)).decode("utf-8")
+
+
+class CompiledTemplateTest(unittest.TestCase):
+    def test_sheet_values_are_escaped(self):
+        row = {"name": '<script>alert("x")</script>', "company": "Tom & Jerry's"}
+        self.assertEqual(
+            render("<p>Hi {{name}} of {{ Company }}</p>", row),
+            "<p>Hi &lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; of Tom &amp; Jerry&#x27;s</p>",
+        )
+
+    def test_fallback_for_empty_values(self):
+        source = "Hi {{name|there}}, {{city | your city}}!"
+        self.assertEqual(render(source, {"name": "Asha", "city": "Pune"}), "Hi Asha, Pune!")
+        self.assertEqual(render(source, {"name": "  ", "city": None}), "Hi there, your city!")
+        self.assertEqual(render(source, {}), "Hi there, your city!")
+
+    def test_none_and_nan_render_empty(self):
+        source = "[{{a}}][{{b}}][{{c}}]"
+        self.assertEqual(render(source, {"a": None, "b": float("nan"), "c": 9876543210.0}), "[][][9876543210]")
+
+    def test_batch_matches_single_rows(self):
+        template = CompiledTemplate("{{name}} <{{email}}>")
+        rows = [{"name": "A & B", "email": "a@x.com"}, {"name": "A & B", "email": "b@x.com"}, {}]
+        self.assertEqual(template.bind_batch(rows), [template.bind(row) for row in rows])
+
+
+class CheckMergeFieldsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="navyanta_personalize_")
+        logger = logging.getLogger(f"navyanta.test.{self.id()}")
+        logger.propagate = False
+        config = load_config()
+        config.update(METRICS_TEXTFILE="")
+        secrets = {"SENDER_ACCOUNTS": [{"email": "test@example.com", "host": "127.0.0.1", "port": 25, "use_tls": False}]}
+        self.engine = Engine(config, secrets, data_dir=self.dir, logs_dir=self.dir, logger=logger)
+
+    def tearDown(self):
+        self.engine.ledger.close()
+        self.engine.locks.close()
+        self.engine.accounts.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_unknown_fields_are_reported(self):
+        recipients = SimpleNamespace(columns=["email", "name", "city"])
+        body = "Hi {{ Name }} from {{city|there}}, about {{plan}} and {{ Seats | 1 }}"
+        self.assertEqual(merge_fields(body), {"name", "city", "plan", "seats"})
+        with self.assertRaises(ValueError) as raised:
+            self.engine.check_merge_fields(body, recipients)
+        self.assertIn("{{plan}}, {{seats}}", str(raised.exception))
+        self.engine.check_merge_fields("Hi {{name}} in {{CITY}}", recipients)
+
+
+if __name__ == "__main__":
+    unittest.main()
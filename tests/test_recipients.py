@@ -0,0 +1,87 @@
+import csv
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.recipients import ingest_recipients, validate_emails
+
+
+class ValidateEmailsTest(unittest.TestCase):
+    def check(self, values, **kwargs):
+        emails, reason, role = validate_emails(pd.Series(values), **kwargs)
+        return list(emails), list(reason), list(role)
+
+    def test_accepts_and_normalizes(self):
+        emails, reason, role = self.check(["  Jane.Doe@Example.COM ", "a+tag@sub.example.co.uk", "user@xn--bcher-kva.example"])
+        self.assertEqual(emails, ["jane.doe@example.com", "a+tag@sub.example.co.uk", "user@xn--bcher-kva.example"])
+        self.assertEqual(reason, ["", "", ""])
+        self.assertEqual(role, [False, False, False])
+
+    def test_idn_domains_are_converted(self):
+        emails, reason, _ = self.check(["user@bücher.example"])
+        self.assertEqual(emails, ["user@xn--bcher-kva.example"])
+        self.assertEqual(reason, [""])
+
+    def test_rejects(self):
+        cases = {
+            "": "missing email",
+            "no-at-sign.example.com": "invalid syntax",
+            "two@@example.com": "invalid syntax",
+            "user@localhost": "invalid syntax",
+            "user@example.c": "invalid syntax",
+            "a" * 65 + "@example.com": "too long",
+            "user@" + ".".join(["d" * 60] * 5) + ".com": "too long",
+            "someone@mailinator.com": "disposable domain",
+        }
+        _, reason, _ = self.check(list(cases))
+        self.assertEqual(reason, list(cases.values()))
+
+    def test_extra_disposable_domains(self):
+        _, reason, _ = self.check(["a@burner.example", "b@example.com"], disposable_domains={"burner.example"})
+        self.assertEqual(reason, ["disposable domain", ""])
+
+    def test_role_accounts_are_flagged_and_optionally_rejected(self):
+        values = ["info@example.com", "hr+jobs@example.com", "jane@example.com"]
+        _, reason, role = self.check(values)
+        self.assertEqual(role, [True, True, False])
+        self.assertEqual(reason, ["", "", ""])
+        _, reason, _ = self.check(values, reject_role=True)
+        self.assertEqual(reason, ["role account", "role account", ""])
+
+
+class RejectReportTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="navyanta_recipients_")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_reject_report_lists_sheet_rows(self):
+        source = io.BytesIO(
+            "Name,Email\n"
+            "A,a@example.com\n"
+            "B,not-an-email\n"
+            "C,\n"
+            "D,A@example.com\n"
+            "E,e@mailinator.com\n"
+            "F,info@example.com\n".encode("utf-8")
+        )
+        rejects = os.path.join(self.dir, "rejects.csv")
+        recipients = ingest_recipients(source, "list.csv", os.path.join(self.dir, "list.db"), chunk_rows=2, rejects_path=rejects)
+        summary = recipients.summary()
+        recipients.close()
+        self.assertEqual(summary, {"raw_rows": 6, "rejected": 2, "role_accounts": 1, "valid": 2})
+        with open(rejects, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows, [["Row", "Email", "Reason"], ["3", "not-an-email", "invalid syntax"], ["6", "e@mailinator.com", "disposable domain"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from smtp_sink import SMTPSink
+
+from navyanta.config import load_config
+from navyanta.engine import Engine
+from navyanta.metrics import prometheus_text
+from navyanta.worker import CampaignJob
+
+
+def quiet_logger(name):
+    logger = logging.getLogger(f"navyanta.test.{name}")
+    logger.propagate = False
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+class RunCampaignTest(unittest.TestCase):
+    def setUp(self):
+        self.sink = SMTPSink(latency=0.002).start()
+        self.data_dir = tempfile.mkdtemp(prefix="navyanta_test_")
+
+    def tearDown(self):
+        self.sink.shutdown()
+        self.sink.server_close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def engine(self, **overrides):
+        config = load_config()
+        config.update(
+            RATE_PER_MINUTE=0,
+            RETRY_DELAY=0.05,
+            ACCOUNT_DAILY_QUOTA=0,
+            METRICS_TEXTFILE="",
+        )
+        config.update(overrides)
+        secrets = {"SENDER_ACCOUNTS": [{"email": "test@example.com", "host": "127.0.0.1", "port": self.sink.port, "use_tls": False}]}
+        return Engine(config, secrets, data_dir=self.data_dir, logs_dir=self.data_dir, logger=quiet_logger(self.id()))
+
+    def recipients(self, engine, rows):
+        path = os.path.join(self.data_dir, "list.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Name,Email\n")
+            for i in range(rows):
+                f.write(f"n{i},user{i}@d{i % 7}.example\n")
+        with open(path, "rb") as source:
+            recipients, _ = engine.ingest(source, path)
+        return recipients
+
+    def test_resume_before_pool_drains_keeps_sending(self):
+        # Resuming right after a pause, while the paused pool is still draining, must
+        # not end the run as "Completed" with most recipients unsent.
+        for send_engine in ("asyncio", "threads"):
+            with self.subTest(send_engine=send_engine):
+                engine = self.engine(SEND_ENGINE=send_engine, ASYNC_SESSIONS=20, POOL_SIZE=4)
+                rows = 600
+                recipients = self.recipients(engine, rows)
+                path = recipients.path
+                template = engine.build_message_template("Subject", "Body", None)
+                job = CampaignJob(engine.get_campaign_id(send_engine), send_engine, None, path)
+                job.state = "running"
+                pause = threading.Timer(0.15, job.pause)
+                resume = threading.Timer(0.25, job.resume)
+                pause.start()
+                resume.start()
+                status = engine.run_campaign(job, recipients, template)
+                pause.join()
+                resume.join()
+
+                self.assertEqual(status, "Completed")
+                self.assertEqual(job.sent, rows)
+                self.assertEqual(len(engine.ledger.sent_emails(send_engine)), rows)
+                self.assertFalse(os.path.exists(path))
+                engine.ledger.close()
+                engine.locks.close()
+                engine.accounts.close()
+
+    def test_fresh_rerun_does_not_duplicate_metric_series(self):
+        engine = self.engine()
+        template = engine.build_message_template("Subject", "Body", None)
+        for _ in range(2):
+            engine.delete_campaign_records("c")
+            recipients = self.recipients(engine, 5)
+            job = CampaignJob(engine.get_campaign_id("c"), "c", None, recipients.path)
+            job.state = "running"
+            self.assertEqual(engine.run_campaign(job, recipients, template), "Completed")
+        self.assertEqual(len(engine.recent_metrics()), 2)
+
+        series = [line.rsplit(" ", 1)[0] for line in prometheus_text(engine.recent_metrics()).splitlines() if not line.startswith("#")]
+        self.assertTrue(series)
+        self.assertEqual(len(series), len(set(series)))
+        engine.ledger.close()
+        engine.locks.close()
+        engine.accounts.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.scheduler import DomainScheduler
+
+
+def take(it, count, limit=2.0):
+    # The next `count` recipients handed out, skipping the idle Nones.
+    taken = []
+    deadline = time.monotonic() + limit
+    while len(taken) < count and time.monotonic() < deadline:
+        email = next(it)
+        if email is not None:
+            taken.append(email)
+    return taken
+
+
+class DomainSchedulerTest(unittest.TestCase):
+    def test_one_probe_send_after_a_backoff(self):
+        scheduler = DomainScheduler(base_backoff=0.1, tick=0.02)
+        emails = [f"u{i}@yahoo.com" for i in range(10)]
+        it = scheduler.schedule(emails)
+        first = take(it, 3)
+        self.assertEqual(len(first), 3)
+        for email in first:
+            self.assertTrue(scheduler.defer(email))
+
+        # Backoff over: a single probe, however long it takes to answer.
+        probe = take(it, 1)
+        self.assertEqual(len(probe), 1)
+        self.assertEqual(take(it, 1, limit=0.3), [])
+
+        # The probe is deferred again: another backoff, then another single probe.
+        self.assertTrue(scheduler.defer(probe[0]))
+        probe = take(it, 1)
+        self.assertEqual(len(probe), 1)
+        self.assertEqual(take(it, 1, limit=0.3), [])
+
+        # Once it succeeds the domain flows normally.
+        scheduler.settle(probe[0], True)
+        self.assertEqual(len(take(it, 5)), 5)
+
+    def test_settle_does_not_wait_for_a_slow_list(self):
+        scheduler = DomainScheduler(window=2, tick=0.02)
+        reading = threading.Event()
+        release = threading.Event()
+
+        def recipients():
+            yield "a@x.com"
+            reading.set()
+            release.wait(2)
+            yield "b@y.com"
+
+        it = scheduler.schedule(recipients())
+        first = next(it)
+        thread = threading.Thread(target=lambda: next(it))
+        thread.start()
+        self.assertTrue(reading.wait(1))
+        start = time.monotonic()
+        scheduler.settle(first, True)
+        self.assertLess(time.monotonic() - start, 0.5)
+        release.set()
+        thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.async_sender import AsyncSenderPool
+from navyanta.sender import SenderPool
+
+
+class FakeServer:
+    def noop(self):
+        return 250, b"OK"
+
+    def quit(self):
+        pass
+
+
+class AsyncFakeServer:
+    async def noop(self):
+        return 250, b"OK"
+
+    async def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SenderPoolTest(unittest.TestCase):
+    def test_stop_before_run_is_not_lost(self):
+        # The job can be paused between building the pool and its first pass.
+        sent = []
+
+        async def connect():
+            return AsyncFakeServer()
+
+        async def send(server, email):
+            sent.append(email)
+
+        pools = {
+            "threads": SenderPool(FakeServer, lambda server, email: sent.append(email), size=2),
+            "asyncio": AsyncSenderPool(connect, send, size=2),
+        }
+        for name, pool in pools.items():
+            with self.subTest(pool=name):
+                pool.stop()
+                results = list(pool.run(iter([f"u{i}@x.com" for i in range(50)])))
+                self.assertEqual(results, [])
+                self.assertEqual(sent, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
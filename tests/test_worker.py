@@ -0,0 +1,28 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from navyanta.worker import CampaignManager
+
+
+class CampaignManagerTest(unittest.TestCase):
+    def wait(self, job):
+        deadline = time.monotonic() + 5
+        while job.state in ("queued", "running") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return job.state
+
+    def test_state_follows_returned_status(self):
+        manager = CampaignManager(2)
+        cases = {"Completed": "completed", "Stopped": "stopped", "Interrupted": "failed"}
+        for status, state in cases.items():
+            with self.subTest(status=status):
+                job = manager.submit("id", "name", lambda job, status=status: status)
+                self.assertEqual(self.wait(job), state)
+
+
+if __name__ == "__main__":
+    unittest.main()